@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+from array import array
+from dataclasses import dataclass
+from pathlib import Path
+
+from .config import CacheConfig
+
+
+_MERSENNE = (1 << 61) - 1
+_MASK64 = (1 << 64) - 1
+
+# Volatile bits of templated prompts that should not defeat the cache.
+_NORMALIZERS: list[tuple[re.Pattern[str], str]] = [
+    (re.compile(r"\d{4}-\d{2}-\d{2}(?:[t ]\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?(?:z|[+-]\d{2}:?\d{2})?)?"), " <ts> "),
+    (re.compile(r"\b\d{1,2}:\d{2}(?::\d{2})?\b"), " <time> "),
+    (re.compile(r"\b[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\b"), " <id> "),
+    (re.compile(r"\b[0-9a-f]{12,}\b"), " <id> "),
+    (re.compile(r"(?:[a-z]:)?(?:[\\/][\w.\-]+){2,}[\\/]?"), " <path> "),
+    (re.compile(r"\s+"), " "),
+]
+
+
+def normalize_prompt(prompt: str) -> str:
+    out = prompt.lower()
+    for pat, repl in _NORMALIZERS:
+        out = pat.sub(repl, out)
+    return out.strip()
+
+
+def _shingles(text: str, k: int = 3) -> set[bytes]:
+    words = text.split()
+    if len(words) <= k:
+        return {" ".join(words).encode("utf-8")}
+    return {" ".join(words[i : i + k]).encode("utf-8") for i in range(len(words) - k + 1)}
+
+
+def _hash64(data: bytes) -> int:
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "little")
+
+
+class MinHasher:
+    """MinHash signatures over word 3-gram shingles (deterministic across runs)."""
+
+    def __init__(self, num_perm: int = 64, seed: int = 1):
+        rng = random.Random(seed)
+        self.num_perm = num_perm
+        self._perms = [(rng.randrange(1, _MERSENNE), rng.randrange(0, _MERSENNE)) for _ in range(num_perm)]
+
+    def signature(self, text: str) -> array:
+        hashes = [_hash64(s) for s in _shingles(text)]
+        sig = array("Q")
+        for a, b in self._perms:
+            sig.append(min(((a * h + b) % _MERSENNE) for h in hashes) & _MASK64)
+        return sig
+
+
+def estimate_similarity(a: array, b: array) -> float:
+    return sum(x == y for x, y in zip(a, b)) / len(a)
+
+
+@dataclass
+class CacheHit:
+    entry_id: int
+    similarity: float
+    text: str
+    model: str
+    provider: str
+
+
+class SimilarityCache:
+    """Near-duplicate prompt cache backed by a MinHash LSH index in SQLite.
+
+    Only signatures and responses are stored; prompts never touch disk.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        threshold: float = 0.9,
+        ttl_seconds: float = 86400.0,
+        num_perm: int = 64,
+        bands: int = 16,
+        prune_every: int = 256,
+    ):
+        if num_perm % bands:
+            raise ValueError("cache num_perm must be a multiple of bands")
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.bands = bands
+        self._rows = num_perm // bands
+        self._hasher = MinHasher(num_perm=num_perm)
+        self._lock = threading.Lock()
+        # Expired rows are dropped on open and then every ``prune_every`` stores.
+        self._prune_every = prune_every
+        self._stores = 0
+
+        expanded = Path(os.path.expandvars(os.path.expanduser(path)))
+        expanded.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(expanded), check_same_thread=False)
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS entries (
+                id INTEGER PRIMARY KEY,
+                created REAL NOT NULL,
+                sig BLOB NOT NULL,
+                provider TEXT NOT NULL,
+                model TEXT NOT NULL,
+                text TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS bands (
+                key INTEGER NOT NULL,
+                entry_id INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS bands_key ON bands(key);
+            CREATE INDEX IF NOT EXISTS bands_entry ON bands(entry_id);
+            CREATE INDEX IF NOT EXISTS entries_created ON entries(created);
+            """
+        )
+        self.prune()
+
+    @classmethod
+    def from_config(cls, c: CacheConfig) -> SimilarityCache | None:
+        if not c.enabled:
+            return None
+        return cls(c.path, threshold=c.threshold, ttl_seconds=c.ttl_seconds, num_perm=c.num_perm, bands=c.bands)
+
+    def _band_keys(self, sig: array) -> list[int]:
+        keys = []
+        for b in range(self.bands):
+            chunk = sig[b * self._rows : (b + 1) * self._rows]
+            h = _hash64(bytes([b]) + chunk.tobytes())
+            keys.append(h - (1 << 64) if h >= (1 << 63) else h)  # SQLite INTEGER is signed
+        return keys
+
+    def lookup(self, prompt: str) -> CacheHit | None:
+        sig = self._hasher.signature(normalize_prompt(prompt))
+        keys = self._band_keys(sig)
+        cutoff = time.time() - self.ttl_seconds
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT DISTINCT e.id, e.sig, e.provider, e.model, e.text FROM bands b JOIN entries e ON e.id = b.entry_id "
+                f"WHERE b.key IN ({','.join('?' * len(keys))}) AND e.created >= ?",
+                (*keys, cutoff),
+            ).fetchall()
+
+        best: CacheHit | None = None
+        for entry_id, blob, provider, model, text in rows:
+            other = array("Q")
+            other.frombytes(blob)
+            sim = estimate_similarity(sig, other)
+            if sim >= self.threshold and (best is None or sim > best.similarity):
+                best = CacheHit(entry_id=entry_id, similarity=sim, text=text, model=model, provider=provider)
+        return best
+
+    def store(self, prompt: str, text: str, *, provider: str, model: str) -> None:
+        sig = self._hasher.signature(normalize_prompt(prompt))
+        with self._lock, self._db:
+            cur = self._db.execute(
+                "INSERT INTO entries (created, sig, provider, model, text) VALUES (?, ?, ?, ?, ?)",
+                (time.time(), sig.tobytes(), provider, model, text),
+            )
+            self._db.executemany("INSERT INTO bands (key, entry_id) VALUES (?, ?)", [(k, cur.lastrowid) for k in self._band_keys(sig)])
+            self._stores += 1
+            due = self._prune_every > 0 and self._stores % self._prune_every == 0
+        if due:
+            self.prune()
+
+    def prune(self) -> int:
+        """Drop expired entries; returns how many were removed."""
+        cutoff = time.time() - self.ttl_seconds
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM bands WHERE entry_id IN (SELECT id FROM entries WHERE created < ?)", (cutoff,))
+            return self._db.execute("DELETE FROM entries WHERE created < ?", (cutoff,)).rowcount
+
+    def close(self) -> None:
+        self._db.close()
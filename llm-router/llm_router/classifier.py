@@ -1,41 +1,242 @@
 from __future__ import annotations
 
+import json
 import re
+from collections import OrderedDict
+from typing import Any, Mapping
 
 from .errors import ErrorCategory
 
 
+# Highest priority first. When several rules match, the earliest category here wins.
+_PRIORITY: list[ErrorCategory] = [
+    ErrorCategory.QUOTA_EXHAUSTED,
+    ErrorCategory.RATE_LIMITED,
+    ErrorCategory.AUTH_ERROR,
+    ErrorCategory.INVALID_REQUEST,
+    ErrorCategory.TRANSIENT_NETWORK,
+]
+
+# Status codes only count with context ("HTTP 403", "status: 400", "403 Forbidden");
+# bare numbers in long logs (line numbers, sizes, ids) are too noisy.
+_HTTP = r"(?:http|status|code|error)(?:[\s:=_\-\"']*code)?[\s:=_\-\"']*"
+
+DEFAULT_RULES: dict[ErrorCategory, list[str]] = {
+    ErrorCategory.QUOTA_EXHAUSTED: [
+        r"quota\s*exceeded",
+        r"insufficient[\s_]*quota",
+        r"usage\s*limit\s*reached",
+        r"billing\s*(?:hard\s*)?limit",
+        r"exceeded\s*your\s*current\s*quota",
+    ],
+    ErrorCategory.RATE_LIMITED: [
+        r"rate[\s_]*limit(?:ed|_exceeded|_error)?",
+        r"too\s*many\s*requests",
+        _HTTP + r"429",
+    ],
+    ErrorCategory.AUTH_ERROR: [
+        r"unauthorized",
+        r"forbidden",
+        r"invalid[\s_]*api[\s_]*key",
+        r"invalid\s*token",
+        r"expired\s*token",
+        r"no\s*api\s*key",
+        r"not\s*logged\s*in",
+        r"authentication\s*failed",
+        _HTTP + r"40[13]",
+    ],
+    ErrorCategory.INVALID_REQUEST: [
+        r"invalid\s*request",
+        r"bad\s*request",
+        r"unknown\s*model",
+        r"model\s*not\s*found",
+        r"invalid\s*argument",
+        r"unsupported",
+        _HTTP + r"400",
+    ],
+    ErrorCategory.TRANSIENT_NETWORK: [
+        r"timeout",
+        r"timed\s*out",
+        r"temporarily\s*unavailable",
+        r"overloaded",
+        r"try\s*again\s*later",
+        r"connection\s*(?:reset|refused)",
+        r"dns",
+        r"network\s*error",
+        r"econnreset",
+        r"econnrefused",
+    ],
+}
+
+# Values seen in the `type` / `code` / `status` fields of provider JSON error bodies
+# (OpenAI, Anthropic and Google API formats), lower-cased.
+_JSON_CODES: dict[str, ErrorCategory] = {
+    "insufficient_quota": ErrorCategory.QUOTA_EXHAUSTED,
+    "billing_hard_limit_reached": ErrorCategory.QUOTA_EXHAUSTED,
+    "rate_limit_exceeded": ErrorCategory.RATE_LIMITED,
+    "rate_limit_error": ErrorCategory.RATE_LIMITED,
+    "resource_exhausted": ErrorCategory.RATE_LIMITED,
+    "authentication_error": ErrorCategory.AUTH_ERROR,
+    "permission_error": ErrorCategory.AUTH_ERROR,
+    "invalid_api_key": ErrorCategory.AUTH_ERROR,
+    "unauthenticated": ErrorCategory.AUTH_ERROR,
+    "permission_denied": ErrorCategory.AUTH_ERROR,
+    "invalid_request_error": ErrorCategory.INVALID_REQUEST,
+    "not_found_error": ErrorCategory.INVALID_REQUEST,
+    "model_not_found": ErrorCategory.INVALID_REQUEST,
+    "invalid_argument": ErrorCategory.INVALID_REQUEST,
+    "not_found": ErrorCategory.INVALID_REQUEST,
+    "overloaded_error": ErrorCategory.TRANSIENT_NETWORK,
+    "api_error": ErrorCategory.TRANSIENT_NETWORK,
+    "server_error": ErrorCategory.TRANSIENT_NETWORK,
+    "unavailable": ErrorCategory.TRANSIENT_NETWORK,
+    "deadline_exceeded": ErrorCategory.TRANSIENT_NETWORK,
+    "internal": ErrorCategory.TRANSIENT_NETWORK,
+}
+
+_HTTP_STATUS: dict[int, ErrorCategory] = {
+    400: ErrorCategory.INVALID_REQUEST,
+    401: ErrorCategory.AUTH_ERROR,
+    403: ErrorCategory.AUTH_ERROR,
+    404: ErrorCategory.INVALID_REQUEST,
+    429: ErrorCategory.RATE_LIMITED,
+    500: ErrorCategory.TRANSIENT_NETWORK,
+    502: ErrorCategory.TRANSIENT_NETWORK,
+    503: ErrorCategory.TRANSIENT_NETWORK,
+    504: ErrorCategory.TRANSIENT_NETWORK,
+    529: ErrorCategory.TRANSIENT_NETWORK,
+}
+
+_JSON_START = re.compile(r"\{\s*\"(?:error|type)\"")
+_MAX_JSON_CANDIDATES = 4
+
+
+def _compile(rules: Mapping[ErrorCategory, list[str]]) -> tuple[re.Pattern[str], dict[str, ErrorCategory]]:
+    groups: list[str] = []
+    names: dict[str, ErrorCategory] = {}
+    for cat in _PRIORITY:
+        patterns = rules.get(cat)
+        if not patterns:
+            continue
+        name = f"c_{cat.value}"
+        names[name] = cat
+        groups.append(f"(?P<{name}>" + "|".join(f"(?:{p})" for p in patterns) + ")")
+    return re.compile(r"\b(?:" + "|".join(groups) + r")\b", re.I), names
+
+
+_DEFAULT_SCANNER = _compile(DEFAULT_RULES)
+
+
 class ErrorClassifier:
-    """Provider-agnostic pattern matcher.
+    """Pattern matcher for provider error output.
+
+    Signals are checked from most to least structured: configured exit codes,
+    then JSON error bodies, then a single combined regex over a bounded
+    head/tail window of the text. Results are memoized in a small LRU keyed on
+    that window.
 
     This intentionally errs on the conservative side: we only classify as a
     "limit" when strong signals exist.
     """
 
-    _RATE_LIMIT = re.compile(r"\b(rate\s*limit|too\s*many\s*requests|http\s*429|429)\b", re.I)
-    _QUOTA = re.compile(
-        r"\b(quota\s*exceeded|insufficient\s*quota|insufficient_quota|usage\s*limit\s*reached|billing\s*(?:hard\s*)?limit|exceeded\s*your\s*current\s*quota)\b",
-        re.I,
-    )
-    _AUTH = re.compile(r"\b(unauthorized|forbidden|invalid\s*api\s*key|invalid\s*token|expired\s*token|no\s*api\s*key|not\s*logged\s*in|authentication\s*failed|http\s*401|401|http\s*403|403)\b", re.I)
-    _TRANSIENT = re.compile(r"\b(timeout|timed\s*out|temporarily\s*unavailable|overloaded|try\s*again\s*later|connection\s*(?:reset|refused)|dns|network\s*error|econnreset|econnrefused)\b", re.I)
-    _INVALID = re.compile(r"\b(invalid\s*request|bad\s*request|http\s*400|400|unknown\s*model|model\s*not\s*found|invalid\s*argument|unsupported)\b", re.I)
+    def __init__(
+        self,
+        rules: Mapping[str, list[str]] | None = None,
+        exit_codes: Mapping[int, str] | None = None,
+        *,
+        window_chars: int = 4096,
+        cache_size: int = 256,
+    ):
+        if rules:
+            merged = {cat: list(pats) for cat, pats in DEFAULT_RULES.items()}
+            for cat_name, pats in rules.items():
+                # Provider-specific rules are tried ahead of the defaults for the same category.
+                cat = ErrorCategory(cat_name)
+                merged[cat] = list(pats) + merged.get(cat, [])
+            self._scanner, self._groups = _compile(merged)
+        else:
+            self._scanner, self._groups = _DEFAULT_SCANNER
+        self._exit_codes = {int(k): ErrorCategory(v) for k, v in (exit_codes or {}).items()}
+        self._window_chars = window_chars
+        self._cache_size = cache_size
+        self._cache: OrderedDict[tuple[str, int | None], ErrorCategory] = OrderedDict()
 
-    def classify(self, text: str) -> ErrorCategory:
+    def _window(self, text: str) -> str:
+        n = self._window_chars
+        if len(text) <= 2 * n:
+            return text
+        return text[:n] + "\n" + text[-n:]
+
+    def classify(self, text: str, exit_code: int | None = None) -> ErrorCategory:
+        if exit_code is not None and exit_code in self._exit_codes:
+            return self._exit_codes[exit_code]
         if not text:
             return ErrorCategory.UNKNOWN
 
-        t = text.strip()
+        window = self._window(text).strip()
+        key = (window, exit_code)
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            return cached
+
+        cat = self._classify_json(window)
+        if cat is None:
+            cat = self._scan(window)
+
+        if self._cache_size > 0:
+            self._cache[key] = cat
+            if len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+        return cat
+
+    def _scan(self, text: str) -> ErrorCategory:
+        best: int | None = None
+        for m in self._scanner.finditer(text):
+            rank = _PRIORITY.index(self._groups[m.lastgroup])  # type: ignore[index]
+            if best is None or rank < best:
+                best = rank
+                if rank == 0:
+                    break
+        return _PRIORITY[best] if best is not None else ErrorCategory.UNKNOWN
+
+    def _classify_json(self, text: str) -> ErrorCategory | None:
+        if "{" not in text:
+            return None
+        decoder = json.JSONDecoder()
+        for i, m in enumerate(_JSON_START.finditer(text)):
+            if i >= _MAX_JSON_CANDIDATES:
+                break
+            try:
+                obj, _ = decoder.raw_decode(text, m.start())
+            except ValueError:
+                continue
+            cat = self._from_error_body(obj)
+            if cat is not None:
+                return cat
+        return None
+
+    def _from_error_body(self, obj: Any) -> ErrorCategory | None:
+        if not isinstance(obj, dict):
+            return None
+        err = obj.get("error", obj)
+        if not isinstance(err, dict):
+            # e.g. {"error": "some message"}
+            return self._scan(str(err)) if err else None
 
-        if self._QUOTA.search(t):
-            return ErrorCategory.QUOTA_EXHAUSTED
-        if self._RATE_LIMIT.search(t):
-            return ErrorCategory.RATE_LIMITED
-        if self._AUTH.search(t):
-            return ErrorCategory.AUTH_ERROR
-        if self._INVALID.search(t):
-            return ErrorCategory.INVALID_REQUEST
-        if self._TRANSIENT.search(t):
-            return ErrorCategory.TRANSIENT_NETWORK
+        candidates: list[ErrorCategory] = []
+        for field in ("type", "code", "status"):
+            v = err.get(field)
+            if isinstance(v, int) and v in _HTTP_STATUS:
+                candidates.append(_HTTP_STATUS[v])
+            elif isinstance(v, str) and v.lower() in _JSON_CODES:
+                candidates.append(_JSON_CODES[v.lower()])
+        msg = err.get("message")
+        if isinstance(msg, str) and msg:
+            scanned = self._scan(msg)
+            if scanned != ErrorCategory.UNKNOWN:
+                candidates.append(scanned)
 
-        return ErrorCategory.UNKNOWN
+        if not candidates:
+            return None
+        return min(candidates, key=_PRIORITY.index)
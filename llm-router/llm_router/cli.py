@@ -1,13 +1,24 @@
 from __future__ import annotations
 
 import argparse
+import json
 import sys
+import time
 
-from .config import load_config
+from .classifier import ErrorClassifier
+from .config import ProviderConfig, load_config, parse_duration
 from .errors import ProviderError
+from .fanout import MERGE_STRATEGIES
 from .logging import JsonlLogger
-from .providers import AnthropicClaudeProvider, GoogleGeminiProvider, OpenAICodexProvider
+from .providers import AnthropicClaudeProvider, GoogleGeminiProvider, OpenAICodexProvider, RecordingProvider, ReplayProvider
 from .router import Router
+from .usage import UsageLedger
+
+
+def _classifier(pcfg: ProviderConfig | None) -> ErrorClassifier | None:
+    if not pcfg or not (pcfg.error_rules or pcfg.error_exit_codes):
+        return None
+    return ErrorClassifier(rules=pcfg.error_rules, exit_codes=pcfg.error_exit_codes)
 
 
 def build_providers(cfg) -> dict[str, object]:
@@ -17,13 +28,76 @@ def build_providers(cfg) -> dict[str, object]:
     a = cfg.providers.get("anthropic_claude")
     g = cfg.providers.get("google_gemini")
 
-    p["openai_codex"] = OpenAICodexProvider(name="openai_codex", cli_cmd=o.cli_cmd if o else "codex")
-    p["anthropic_claude"] = AnthropicClaudeProvider(name="anthropic_claude", cli_cmd=a.cli_cmd if a else "claude")
-    p["google_gemini"] = GoogleGeminiProvider(name="google_gemini", cli_cmd=g.cli_cmd if g else "gemini")
+    p["openai_codex"] = OpenAICodexProvider(
+        name="openai_codex", cli_cmd=o.cli_cmd if o else "codex", classifier=_classifier(o), output_rules=o.output_filter if o else None
+    )
+    p["anthropic_claude"] = AnthropicClaudeProvider(
+        name="anthropic_claude", cli_cmd=a.cli_cmd if a else "claude", classifier=_classifier(a), output_rules=a.output_filter if a else None
+    )
+    p["google_gemini"] = GoogleGeminiProvider(
+        name="google_gemini", cli_cmd=g.cli_cmd if g else "gemini", classifier=_classifier(g), output_rules=g.output_filter if g else None
+    )
+
+    # `mode: replay` swaps the CLI for recorded interactions (offline/CI load testing).
+    for name, pcfg in cfg.providers.items():
+        if pcfg.mode == "replay" and pcfg.replay_file:
+            p[name] = ReplayProvider(name, pcfg.replay_file, latency=pcfg.replay_latency, latency_scale=pcfg.replay_latency_scale)
     return p
 
 
+def usage_main(argv: list[str]) -> None:
+    ap = argparse.ArgumentParser(prog="llm-run usage", description="Report recorded provider usage and budget utilization")
+    ap.add_argument("--config", dest="config", default=None, help="Path to config.yml")
+    ap.add_argument("--window", default="24h", help="Time window, e.g. 30m, 5h, 7d (default 24h)")
+    ap.add_argument("--by", default="provider,model,credential", help="Comma-separated grouping: provider, model, credential")
+    ap.add_argument("--json", action="store_true", help="Emit JSON instead of a table")
+    args = ap.parse_args(argv)
+
+    group_by = tuple(c.strip() for c in args.by.split(",") if c.strip())
+    if not group_by or any(c not in ("provider", "model", "credential") for c in group_by):
+        ap.error("--by takes a comma-separated subset of: provider, model, credential")
+
+    cfg = load_config(args.config)
+    logger = JsonlLogger(log_dir=cfg.router.log_dir)
+    path = logger.log_dir / "usage.sqlite3"
+    if not path.exists():
+        sys.stderr.write(f"No usage recorded yet ({path}).\n")
+        return
+    ledger = UsageLedger(path)
+    now = time.time()
+    rows = ledger.summary(since=now - parse_duration(args.window), group_by=group_by)
+    budgets = {n: round(ledger.utilization(n, p.budgets, now), 4) for n, p in cfg.providers.items() if p.budgets}
+
+    if args.json:
+        out = {
+            "window": args.window,
+            "group_by": list(group_by),
+            "rows": [
+                {"key": list(r.key), "requests": r.requests, "errors": r.errors, "input_tokens": r.input_tokens, "output_tokens": r.output_tokens}
+                for r in rows
+            ],
+            "budget_utilization": budgets,
+        }
+        sys.stdout.write(json.dumps(out, indent=2) + "\n")
+        return
+
+    header = [*group_by, "requests", "errors", "in_tokens", "out_tokens"]
+    table = [header] + [[*(k or "-" for k in r.key), str(r.requests), str(r.errors), str(r.input_tokens), str(r.output_tokens)] for r in rows]
+    widths = [max(len(row[i]) for row in table) for i in range(len(header))]
+    sys.stdout.write(f"Usage over the last {args.window}:\n")
+    for row in table:
+        sys.stdout.write("  ".join(c.ljust(w) for c, w in zip(row, widths)).rstrip() + "\n")
+    for name, used in budgets.items():
+        state = "shifting" if used >= cfg.router.usage_shift_at else "degrading" if used >= cfg.router.usage_degrade_at else "ok"
+        sys.stdout.write(f"budget {name}: {used:.0%} used ({state})\n")
+
+
 def main(argv: list[str] | None = None) -> None:
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] == "usage":
+        usage_main(argv[1:])
+        return
+
     ap = argparse.ArgumentParser(prog="llm-run", description="Route LLM requests across multiple providers with failover")
     ap.add_argument("prompt", help="User prompt")
     ap.add_argument("--config", dest="config", default=None, help="Path to config.yml")
@@ -31,22 +105,51 @@ def main(argv: list[str] | None = None) -> None:
     ap.add_argument("--verbose", action="store_true")
     ap.add_argument("--log-prompts", action="store_true", help="Log prompts to JSONL (redacted). Off by default.")
     ap.add_argument("--max-output-tokens", type=int, default=None)
+    ap.add_argument("--fanout", type=int, default=None, metavar="N", help="Run on N providers concurrently and merge (consensus)")
+    ap.add_argument("--merge", choices=sorted(MERGE_STRATEGIES), default=None, help="Merge strategy for --fanout (default from config)")
+    ap.add_argument("--no-cache", action="store_true", help="Bypass the similarity cache for this request")
+    ap.add_argument("--record", default=None, metavar="PATH", help="Append provider interactions to a replay recording (.jsonl or .jsonl.gz)")
+    ap.add_argument("--deadline", type=float, default=None, help="Overall time budget in seconds across retries and failover")
 
     args = ap.parse_args(argv)
+    if args.fanout and args.provider:
+        ap.error("--provider cannot be combined with --fanout")
 
     cfg = load_config(args.config)
     logger = JsonlLogger(log_dir=cfg.router.log_dir, log_prompts=(cfg.router.log_prompts or args.log_prompts))
     providers = build_providers(cfg)
+    if args.record:
+        providers = {n: RecordingProvider(prov, args.record) for n, prov in providers.items()}
 
     router = Router(cfg=cfg, providers=providers, logger=logger)
 
     try:
+        if args.fanout or (cfg.router.routing_policy == "consensus" and not args.provider):
+            result = router.fanout(
+                args.prompt,
+                n=args.fanout,
+                merge=args.merge,
+                verbose=args.verbose,
+                log_prompts=args.log_prompts,
+                max_output_tokens=args.max_output_tokens,
+                deadline=args.deadline,
+            )
+            if args.verbose:
+                for r in result.results:
+                    status = "ok" if r.response else (r.error.category.value if r.error else "?")
+                    sys.stderr.write(f"[{r.provider}] {r.latency_ms}ms {status}\n")
+                sys.stderr.write(f"merged ({result.strategy}) from {result.provider}\n")
+            sys.stdout.write(result.merged.text + "\n")
+            return
+
         resp = router.run(
             args.prompt,
             force_provider=args.provider,
             verbose=args.verbose,
             log_prompts=args.log_prompts,
             max_output_tokens=args.max_output_tokens,
+            deadline=args.deadline,
+            use_cache=not args.no_cache,
         )
         sys.stdout.write(resp.text + "\n")
     except ProviderError as e:
@@ -1,19 +1,196 @@
 from __future__ import annotations
 
 import os
-from dataclasses import dataclass
+import re
+from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Any
 
 import yaml
 
 
+@dataclass
+class CredentialProfile:
+    """One legitimately provisioned account for a provider CLI.
+
+    ``env`` values may reference environment variables (``${OPENAI_KEY_B}``) so
+    secrets stay out of config.yml. ``config_dir`` points the CLI at a separate
+    login/config directory where the adapter supports it.
+    """
+
+    name: str
+    env: dict[str, str] = field(default_factory=dict)
+    config_dir: str | None = None
+
+
+@dataclass
+class Budget:
+    """Usage budget over a sliding window; either limit may be omitted."""
+
+    window_seconds: float
+    max_requests: int | None = None
+    max_tokens: int | None = None  # estimated input + output tokens
+    model: str | None = None  # restrict to one model; None counts all
+    credential: str | None = None  # restrict to one credential profile; None counts all
+
+
+_DURATION = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*([smhd]?)\s*$", re.I)
+_DURATION_UNITS = {"": 1, "s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def parse_duration(value: str | int | float) -> float:
+    """Seconds from ``90``, ``"30m"``, ``"5h"`` or ``"7d"``."""
+    if isinstance(value, (int, float)):
+        return float(value)
+    m = _DURATION.match(value)
+    if not m:
+        raise ValueError(f"invalid duration: {value!r}")
+    return float(m.group(1)) * _DURATION_UNITS[m.group(2).lower()]
+
+
+def _parse_budgets(data: Any) -> list[Budget]:
+    if not isinstance(data, list):
+        return []
+    budgets: list[Budget] = []
+    for b in data:
+        if not isinstance(b, dict):
+            continue
+        budgets.append(
+            Budget(
+                window_seconds=parse_duration(b.get("window", "1d")),
+                max_requests=int(b["max_requests"]) if b.get("max_requests") else None,
+                max_tokens=int(b["max_tokens"]) if b.get("max_tokens") else None,
+                model=b.get("model"),
+                credential=b.get("credential"),
+            )
+        )
+    return budgets
+
+
+@dataclass
+class OutputRules:
+    """Streaming stdout cleanup for a CLI provider (see providers.output_filter)."""
+
+    strip_ansi: bool = True
+    drop_lines: list[str] = field(default_factory=list)  # regexes for noise lines
+    section_start: str | None = None  # keep only what follows the last matching line
+
+
+def _parse_output_rules(data: Any) -> OutputRules | None:
+    if not isinstance(data, dict):
+        return None
+    return OutputRules(
+        strip_ansi=bool(data.get("strip_ansi", True)),
+        drop_lines=[str(x) for x in (data.get("drop_lines") or [])],
+        section_start=data.get("section_start"),
+    )
+
+
 @dataclass
 class ProviderConfig:
     mode: str
     cli_cmd: str | None = None
     model_primary: str | None = None
     model_degraded: str | None = None
+    # Extra classifier regexes keyed by ErrorCategory value, tried before the defaults.
+    error_rules: dict[str, list[str]] = field(default_factory=dict)
+    # CLI exit code -> ErrorCategory value, checked before any text matching.
+    error_exit_codes: dict[int, str] = field(default_factory=dict)
+    # Optional credential pool; empty means the CLI's own default login.
+    profiles: list[CredentialProfile] = field(default_factory=list)
+    credential_strategy: str = "round_robin"  # or "least_recently_limited"
+    quota_cooldown_seconds: float = 3600.0
+    rate_limit_cooldown_seconds: float = 60.0
+    # mode: replay -- serve recorded interactions instead of spawning the CLI.
+    replay_file: str | None = None
+    replay_latency: str = "recorded"  # or "sampled"
+    replay_latency_scale: float = 1.0
+    budgets: list[Budget] = field(default_factory=list)
+    # Extra output cleanup on top of the adapter's defaults.
+    output_filter: OutputRules | None = None
+
+
+@dataclass
+class RetryPolicy:
+    """Per-error-category retry policy applied within a single provider.
+
+    Delays use full jitter: ``uniform(0, min(max_delay, base_delay * 2**n))``.
+    ``budget_seconds`` caps the total time spent on one provider (attempts plus
+    sleeps) before the router fails over.
+    """
+
+    max_attempts: int = 1
+    base_delay_seconds: float = 0.3
+    max_delay_seconds: float = 5.0
+    budget_seconds: float | None = None
+
+
+def default_retry_policies() -> dict[str, RetryPolicy]:
+    # Only retry errors that are likely to clear up quickly. Everything else
+    # (including rate limits) fails over immediately unless configured.
+    return {
+        "transient_network": RetryPolicy(max_attempts=3, base_delay_seconds=0.3, max_delay_seconds=5.0, budget_seconds=30.0),
+    }
+
+
+def _parse_retry(data: Any) -> dict[str, RetryPolicy]:
+    policies = default_retry_policies()
+    if not isinstance(data, dict):
+        return policies
+    for category, p in data.items():
+        if not isinstance(p, dict):
+            continue
+        budget = p.get("budget_seconds")
+        policies[str(category)] = RetryPolicy(
+            max_attempts=max(1, int(p.get("max_attempts", 1))),
+            base_delay_seconds=float(p.get("base_delay_seconds", 0.3)),
+            max_delay_seconds=float(p.get("max_delay_seconds", 5.0)),
+            budget_seconds=float(budget) if budget is not None else None,
+        )
+    return policies
+
+
+def _parse_profiles(data: Any) -> list[CredentialProfile]:
+    if not isinstance(data, list):
+        return []
+    profiles: list[CredentialProfile] = []
+    for i, p in enumerate(data):
+        if not isinstance(p, dict):
+            continue
+        profiles.append(
+            CredentialProfile(
+                name=str(p.get("name", f"profile{i}")),
+                env={str(k): str(v) for k, v in (p.get("env") or {}).items()},
+                config_dir=p.get("config_dir"),
+            )
+        )
+    return profiles
+
+
+@dataclass
+class CacheConfig:
+    """Near-duplicate prompt cache (MinHash + LSH, stored locally in SQLite)."""
+
+    enabled: bool = False
+    path: str = "~/.llm-router/cache.sqlite3"
+    threshold: float = 0.9  # estimated Jaccard similarity of normalized prompts
+    ttl_seconds: float = 86400.0
+    num_perm: int = 64
+    bands: int = 16
+
+
+def _parse_cache(data: Any) -> CacheConfig:
+    if not isinstance(data, dict):
+        return CacheConfig()
+    d = CacheConfig()
+    return CacheConfig(
+        enabled=bool(data.get("enabled", d.enabled)),
+        path=str(data.get("path", d.path)),
+        threshold=float(data.get("threshold", d.threshold)),
+        ttl_seconds=float(data.get("ttl_seconds", d.ttl_seconds)),
+        num_perm=int(data.get("num_perm", d.num_perm)),
+        bands=int(data.get("bands", d.bands)),
+    )
 
 
 @dataclass
@@ -25,6 +202,21 @@ class RouterConfig:
     timeout_seconds: int
     degrade_enabled: bool
     degrade_max_output_tokens: int
+    # Keyed by ErrorCategory value (e.g. "transient_network").
+    retry: dict[str, RetryPolicy] = field(default_factory=default_retry_policies)
+    cache: CacheConfig = field(default_factory=CacheConfig)
+    # routing_policy "consensus": fan out to the first N providers and merge.
+    consensus_n: int = 3
+    consensus_merge: str = "majority"  # first_k | majority | longest
+    consensus_k: int = 1
+    # Router.session(): bounds for the compact history replay.
+    session_max_context_chars: int = 8000
+    session_recent_turns: int = 4
+    # Usage ledger (usage.sqlite3 next to the logs) and budget thresholds, as
+    # fractions of the most-used budget: degrade the model, then shift traffic away.
+    usage_enabled: bool = True
+    usage_degrade_at: float = 0.8
+    usage_shift_at: float = 0.95
 
 
 @dataclass
@@ -70,6 +262,16 @@ def load_config(path: str | None) -> Config:
         timeout_seconds=int(r.get("timeouts", {}).get("provider_seconds", r.get("timeout_seconds", 120))),
         degrade_enabled=bool(r.get("degrade", {}).get("enabled", True)),
         degrade_max_output_tokens=int(r.get("degrade", {}).get("max_output_tokens", 800)),
+        retry=_parse_retry(r.get("retry")),
+        cache=_parse_cache(r.get("cache")),
+        consensus_n=int(r.get("consensus", {}).get("providers", 3)),
+        consensus_merge=str(r.get("consensus", {}).get("merge", "majority")),
+        consensus_k=int(r.get("consensus", {}).get("k", 1)),
+        session_max_context_chars=int(r.get("session", {}).get("max_context_chars", 8000)),
+        session_recent_turns=int(r.get("session", {}).get("recent_turns", 4)),
+        usage_enabled=bool(r.get("usage", {}).get("enabled", True)),
+        usage_degrade_at=float(r.get("usage", {}).get("degrade_at", 0.8)),
+        usage_shift_at=float(r.get("usage", {}).get("shift_at", 0.95)),
     )
 
     providers: dict[str, ProviderConfig] = {}
@@ -83,6 +285,17 @@ def load_config(path: str | None) -> Config:
             cli_cmd=p.get("cli_cmd"),
             model_primary=p.get("model_primary"),
             model_degraded=p.get("model_degraded"),
+            error_rules={str(k): [str(x) for x in (v or [])] for k, v in (p.get("error_rules") or {}).items()},
+            error_exit_codes={int(k): str(v) for k, v in (p.get("error_exit_codes") or {}).items()},
+            profiles=_parse_profiles(p.get("profiles")),
+            credential_strategy=str(p.get("credential_strategy", "round_robin")),
+            quota_cooldown_seconds=float(p.get("quota_cooldown_seconds", 3600.0)),
+            rate_limit_cooldown_seconds=float(p.get("rate_limit_cooldown_seconds", 60.0)),
+            replay_file=p.get("replay_file"),
+            replay_latency=str(p.get("replay_latency", "recorded")),
+            replay_latency_scale=float(p.get("replay_latency_scale", 1.0)),
+            budgets=_parse_budgets(p.get("budgets")),
+            output_filter=_parse_output_rules(p.get("output_filter")),
         )
 
     # Ensure entries exist for ordered providers.
@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+from .config import CredentialProfile, ProviderConfig
+from .errors import ErrorCategory
+
+
+class CredentialPool:
+    """Spreads requests for one provider across several credential profiles.
+
+    Profiles that hit a quota or rate limit are put on cooldown and skipped
+    until it expires. Times come from the caller's (monotonic) clock.
+    """
+
+    STRATEGIES = ("round_robin", "least_recently_limited")
+
+    def __init__(
+        self,
+        profiles: list[CredentialProfile],
+        strategy: str = "round_robin",
+        quota_cooldown_seconds: float = 3600.0,
+        rate_limit_cooldown_seconds: float = 60.0,
+    ):
+        if strategy not in self.STRATEGIES:
+            raise ValueError(f"unknown credential_strategy: {strategy}")
+        self.profiles = list(profiles)
+        self.strategy = strategy
+        self.quota_cooldown_seconds = quota_cooldown_seconds
+        self.rate_limit_cooldown_seconds = rate_limit_cooldown_seconds
+        self._next = 0
+        self._cooldown_until: dict[str, float] = {}
+        self._last_limited: dict[str, float] = {}
+
+    @classmethod
+    def from_config(cls, pcfg: ProviderConfig) -> CredentialPool | None:
+        if not pcfg.profiles:
+            return None
+        return cls(
+            pcfg.profiles,
+            strategy=pcfg.credential_strategy,
+            quota_cooldown_seconds=pcfg.quota_cooldown_seconds,
+            rate_limit_cooldown_seconds=pcfg.rate_limit_cooldown_seconds,
+        )
+
+    def acquire(self, now: float, exclude: set[str] | None = None) -> CredentialProfile | None:
+        """Pick the next usable profile, or None if all are cooling down (or excluded)."""
+        n = len(self.profiles)
+        # Rotate starting point so equally-good profiles share load.
+        order = [self.profiles[(self._next + k) % n] for k in range(n)]
+        candidates = [p for p in order if self._cooldown_until.get(p.name, 0.0) <= now and p.name not in (exclude or set())]
+        if not candidates:
+            return None
+
+        if self.strategy == "least_recently_limited":
+            # min() is stable, so ties keep round-robin order.
+            chosen = min(candidates, key=lambda p: self._last_limited.get(p.name, float("-inf")))
+        else:
+            chosen = candidates[0]
+        self._next = (self.profiles.index(chosen) + 1) % n
+        return chosen
+
+    def mark_limited(self, profile: CredentialProfile, category: ErrorCategory, now: float) -> None:
+        if category == ErrorCategory.QUOTA_EXHAUSTED:
+            cooldown = self.quota_cooldown_seconds
+        elif category == ErrorCategory.RATE_LIMITED:
+            cooldown = self.rate_limit_cooldown_seconds
+        else:
+            return
+        self._last_limited[profile.name] = now
+        self._cooldown_until[profile.name] = max(self._cooldown_until.get(profile.name, 0.0), now + cooldown)
@@ -10,6 +10,7 @@ class ErrorCategory(str, Enum):
     AUTH_ERROR = "auth_error"
     TRANSIENT_NETWORK = "transient_network"
     INVALID_REQUEST = "invalid_request"
+    DEADLINE_EXCEEDED = "deadline_exceeded"
     UNKNOWN = "unknown"
 
 
@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Callable
+
+from .errors import ProviderError
+from .providers.base import ProviderResponse
+
+
+@dataclass
+class FanoutResult:
+    provider: str
+    latency_ms: int  # wall time for this provider, retries included
+    response: ProviderResponse | None = None
+    error: ProviderError | None = None
+
+
+@dataclass
+class ConsensusResult:
+    merged: ProviderResponse
+    provider: str  # provider whose answer was chosen
+    strategy: str
+    # Completion order; providers still running when first_k returned are absent.
+    results: list[FanoutResult] = field(default_factory=list)
+
+
+MergeStrategy = Callable[[list[FanoutResult], int], "FanoutResult | None"]
+
+_PUNCT_EDGES = re.compile(r"^[\W_]+|[\W_]+$")
+
+
+def normalize_answer(text: str) -> str:
+    return _PUNCT_EDGES.sub("", " ".join(text.lower().split()))
+
+
+def merge_first_k(results: list[FanoutResult], k: int) -> FanoutResult | None:
+    # The router stops collecting once k answers are in; they vote, earliest wins ties.
+    ok = [r for r in results if r.response is not None][: max(1, k)]
+    return merge_majority(ok, k)
+
+
+def merge_majority(results: list[FanoutResult], k: int) -> FanoutResult | None:
+    ok = [r for r in results if r.response is not None]
+    if not ok:
+        return None
+    votes = Counter(normalize_answer(r.response.text) for r in ok)  # type: ignore[union-attr]
+    winner, _ = max(votes.items(), key=lambda kv: kv[1])  # ties keep completion order
+    return next(r for r in ok if normalize_answer(r.response.text) == winner)  # type: ignore[union-attr]
+
+
+def merge_longest(results: list[FanoutResult], k: int) -> FanoutResult | None:
+    ok = [r for r in results if r.response is not None]
+    return max(ok, key=lambda r: len(r.response.text)) if ok else None  # type: ignore[union-attr]
+
+
+MERGE_STRATEGIES: dict[str, MergeStrategy] = {
+    "first_k": merge_first_k,
+    "majority": merge_majority,
+    "longest": merge_longest,
+}
+
+
+def resolve_strategy(merge: str | MergeStrategy) -> MergeStrategy:
+    if not isinstance(merge, str):
+        return merge
+    try:
+        return MERGE_STRATEGIES[merge]
+    except KeyError:
+        raise ValueError(f"unknown consensus merge strategy: {merge!r} (expected one of {', '.join(MERGE_STRATEGIES)})") from None
@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable
+
+from .errors import ProviderError
+from .router import Router
+
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list (q in [0, 100])."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(q / 100.0 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+@dataclass
+class LoadReport:
+    requests: int
+    ok: int
+    errors: dict[str, int]
+    duration_s: float
+    latencies_ms: list[float] = field(default_factory=list)  # successful requests, sorted
+
+    @property
+    def throughput_rps(self) -> float:
+        return self.ok / self.duration_s if self.duration_s > 0 else 0.0
+
+    def summary(self) -> str:
+        lat = self.latencies_ms
+        parts = [
+            f"requests={self.requests} ok={self.ok} errors={sum(self.errors.values())}",
+            f"duration={self.duration_s:.2f}s throughput={self.throughput_rps:.2f} rps",
+            "latency_ms " + " ".join(f"p{q}={percentile(lat, q):.0f}" for q in (50, 90, 99)) + f" max={max(lat, default=0):.0f}",
+        ]
+        if self.errors:
+            parts.append("errors_by_category " + " ".join(f"{k}={v}" for k, v in sorted(self.errors.items())))
+        return "\n".join(parts)
+
+
+def run_load(
+    router: Router,
+    prompts: list[str],
+    *,
+    rps: float,
+    duration_s: float,
+    max_concurrency: int = 64,
+    clock: Callable[[], float] = time.monotonic,
+    sleep: Callable[[float], None] = time.sleep,
+    **run_kwargs,
+) -> LoadReport:
+    """Drive ``router.run`` open-loop at ``rps`` for ``duration_s`` and collect latencies.
+
+    Requests are issued on a fixed schedule regardless of completions, so a
+    slow router shows up as queueing latency rather than a lower send rate.
+    """
+    total = max(1, int(rps * duration_s))
+    interval = 1.0 / rps
+    lock = threading.Lock()
+    latencies: list[float] = []
+    errors: dict[str, int] = {}
+
+    def one(i: int, scheduled: float) -> None:
+        try:
+            router.run(prompts[i % len(prompts)], **run_kwargs)
+        except ProviderError as e:
+            with lock:
+                errors[e.category.value] = errors.get(e.category.value, 0) + 1
+            return
+        # Measured from the scheduled send time so client-side queueing counts.
+        elapsed_ms = (clock() - scheduled) * 1000
+        with lock:
+            latencies.append(elapsed_ms)
+
+    start = clock()
+    with ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="llm-load") as ex:
+        for i in range(total):
+            scheduled = start + i * interval
+            delay = scheduled - clock()
+            if delay > 0:
+                sleep(delay)
+            ex.submit(one, i, scheduled)
+    duration = clock() - start
+
+    return LoadReport(requests=total, ok=len(latencies), errors=errors, duration_s=duration, latencies_ms=sorted(latencies))
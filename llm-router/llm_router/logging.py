@@ -21,6 +21,9 @@ class LogEvent:
     error_category: str | None = None
     error_message: str | None = None
     reason: str | None = None
+    attempt: int | None = None  # 1-based attempt number within a provider
+    credential: str | None = None  # credential profile name, when a pool is configured
+    similarity: float | None = None  # cache_hit events only
     prompt: str | None = None  # only if explicitly enabled
 
 
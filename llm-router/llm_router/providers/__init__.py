@@ -1,9 +1,12 @@
 from .openai_codex import OpenAICodexProvider
 from .anthropic_claude import AnthropicClaudeProvider
 from .google_gemini import GoogleGeminiProvider
+from .replay import RecordingProvider, ReplayProvider
 
 __all__ = [
     "OpenAICodexProvider",
     "AnthropicClaudeProvider",
     "GoogleGeminiProvider",
+    "RecordingProvider",
+    "ReplayProvider",
 ]
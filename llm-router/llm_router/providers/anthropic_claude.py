@@ -1,13 +1,22 @@
 from __future__ import annotations
 
+from .base import ResumeToken
 from .cli_provider import CliProvider
 
 
 class AnthropicClaudeProvider(CliProvider):
-    def build_command(self, prompt: str, model: str, max_output_tokens: int) -> list[str]:
+    config_dir_env = "CLAUDE_CONFIG_DIR"
+
+    def supports_resume(self) -> bool:
+        return True
+
+    def build_command(self, prompt: str, model: str, max_output_tokens: int, session: ResumeToken | None = None) -> list[str]:
         # Claude Code supports non-interactive output with `-p/--print`.
         cmd: list[str] = [self.cli_cmd, "-p", "--output-format", "text", "--permission-mode", "default"]
         if model:
             cmd += ["--model", model]
+        if session is not None:
+            # Start the conversation under a known id, then resume it so only the new turn is sent.
+            cmd += ["--session-id", session.id] if session.turn == 0 else ["--resume", session.id]
         cmd += [prompt]
         return cmd
@@ -2,6 +2,7 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 
+from ..config import CredentialProfile
 from ..errors import ProviderError
 
 
@@ -11,6 +12,22 @@ class ProviderResponse:
     model: str
     degraded: bool
     latency_ms: int
+    cached: bool = False
+    provider: str | None = None  # set by the Router
+
+
+@dataclass
+class ResumeToken:
+    """Handle for a provider-native conversation (e.g. Claude's --session-id/--resume).
+
+    ``turn`` 0 starts the native session under ``id``; later turns resume it.
+    ``profile`` is the credential profile the session was started under (set by
+    the Router when the provider has a credential pool).
+    """
+
+    id: str
+    turn: int = 0
+    profile: CredentialProfile | None = None
 
 
 class Provider:
@@ -20,8 +37,25 @@ class Provider:
         """Should raise ProviderError (AUTH/TRANSIENT) if not usable."""
         return None
 
-    def run(self, prompt: str, model: str, timeout_seconds: int, max_output_tokens: int) -> ProviderResponse:
+    def supports_resume(self) -> bool:
+        """True if ``run`` accepts a ``session`` ResumeToken and continues the CLI's own history."""
+        return False
+
+    def run(
+        self,
+        prompt: str,
+        model: str,
+        timeout_seconds: float,
+        max_output_tokens: int,
+        profile: CredentialProfile | None = None,
+        session: ResumeToken | None = None,
+    ) -> ProviderResponse:
+        """``profile`` is only passed when the provider has a credential pool configured;
+        ``session`` only when ``supports_resume()`` is true."""
         raise NotImplementedError
 
     def last_raw_error(self) -> str | None:
         return None
+
+    def last_exit_code(self) -> int | None:
+        return None
@@ -1,21 +1,62 @@
 from __future__ import annotations
 
+import os
 import shutil
+import signal
 import subprocess
+import tempfile
+import threading
 import time
 
 from ..classifier import ErrorClassifier
+from ..config import CredentialProfile, OutputRules
 from ..errors import ErrorCategory, ProviderError
-from .base import Provider, ProviderResponse
+from .base import Provider, ProviderResponse, ResumeToken
+from .output_filter import OutputFilter
+
+# stdout kept for diagnostics when the answer is read from a last-message file.
+_DIAGNOSTIC_TAIL_CHARS = 8192
+# How long the pipe readers get to finish once the CLI itself is gone.
+_PIPE_GRACE_SECONDS = 0.5
+
+
+def _kill_tree(proc: subprocess.Popen) -> None:
+    """Kill the CLI and everything it spawned (npm wrappers and .cmd shims fork children)."""
+    if os.name == "nt":
+        subprocess.run(["taskkill", "/F", "/T", "/PID", str(proc.pid)], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        proc.kill()
+        return
+    try:
+        # The CLI leads its own session, so its pid is also the process group id.
+        os.killpg(proc.pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
 
 
 class CliProvider(Provider):
-    def __init__(self, name: str, cli_cmd: str | None):
+    # Env var the CLI reads its login/config directory from, if it has one.
+    config_dir_env: str | None = None
+    # Flag that makes the CLI write only its final answer to a file (inserted before the prompt).
+    last_message_flag: str | None = None
+    # Adapter defaults for stdout cleanup; config `output_filter` extends them.
+    default_output_rules: OutputRules = OutputRules()
+
+    def __init__(self, name: str, cli_cmd: str | None, classifier: ErrorClassifier | None = None, output_rules: OutputRules | None = None):
         self.name = name
         self.cli_cmd = cli_cmd or name
         self._resolved_cmd: str | None = None
         self._last_err: str | None = None
-        self._classifier = ErrorClassifier()
+        self._last_exit_code: int | None = None
+        self._classifier = classifier or ErrorClassifier()
+        d = self.default_output_rules
+        if output_rules is None:
+            self.output_rules = d
+        else:
+            self.output_rules = OutputRules(
+                strip_ansi=output_rules.strip_ansi,
+                drop_lines=list(d.drop_lines) + list(output_rules.drop_lines),
+                section_start=output_rules.section_start or d.section_start,
+            )
 
     def preflight(self) -> None:
         resolved = shutil.which(self.cli_cmd)
@@ -30,10 +71,44 @@ class CliProvider(Provider):
         """
         return [self.cli_cmd, "--help"]
 
-    def run(self, prompt: str, model: str, timeout_seconds: int, max_output_tokens: int) -> ProviderResponse:
+    def build_env(self, profile: CredentialProfile | None) -> dict[str, str] | None:
+        """Environment for the subprocess; None inherits ours unchanged."""
+        if profile is None:
+            return None
+        env = dict(os.environ)
+        env.update({k: os.path.expandvars(v) for k, v in profile.env.items()})
+        if profile.config_dir:
+            if not self.config_dir_env:
+                raise ProviderError(self.name, ErrorCategory.INVALID_REQUEST, f"config_dir profiles are not supported by {self.name}; use env instead")
+            env[self.config_dir_env] = os.path.expandvars(os.path.expanduser(profile.config_dir))
+        return env
+
+    def run(
+        self,
+        prompt: str,
+        model: str,
+        timeout_seconds: float,
+        max_output_tokens: int,
+        profile: CredentialProfile | None = None,
+        session: ResumeToken | None = None,
+    ) -> ProviderResponse:
         self.preflight()
-        cmd = self.build_command(prompt=prompt, model=model, max_output_tokens=max_output_tokens)
+        env = self.build_env(profile)
+        if session is not None:
+            # Only adapters that override supports_resume() accept `session`.
+            cmd = self.build_command(prompt=prompt, model=model, max_output_tokens=max_output_tokens, session=session)  # type: ignore[call-arg]
+        else:
+            cmd = self.build_command(prompt=prompt, model=model, max_output_tokens=max_output_tokens)
+
+        last_message_path: str | None = None
+        if self.last_message_flag:
+            fd, last_message_path = tempfile.mkstemp(prefix=f"{self.name}-", suffix=".txt")
+            os.close(fd)
+            # Adapters put the prompt last; the flag goes right before it.
+            cmd = cmd[:-1] + [self.last_message_flag, last_message_path] + cmd[-1:]
+
         start = time.time()
+        self._last_exit_code = None
 
         # On Windows, many CLIs are distributed as .cmd shims (npm). Those cannot be executed
         # directly via CreateProcess without going through `cmd.exe /c`.
@@ -44,26 +119,33 @@ class CliProvider(Provider):
             run_cmd = cmd
 
         try:
-            p = subprocess.run(
-                run_cmd,
-                capture_output=True,
-                text=True,
-                timeout=timeout_seconds,
-                stdin=subprocess.DEVNULL,
-            )
-        except subprocess.TimeoutExpired as e:
-            self._last_err = str(e)
-            raise ProviderError(self.name, ErrorCategory.TRANSIENT_NETWORK, "timeout", raw=self._last_err)
+            returncode, out, err = self._stream(run_cmd, env, timeout_seconds, keep_stdout=last_message_path is None)
+            final = ""
+            if last_message_path and returncode == 0:
+                with open(last_message_path, encoding="utf-8", errors="replace") as f:
+                    final = f.read().strip()
+        finally:
+            if last_message_path:
+                try:
+                    os.unlink(last_message_path)
+                except OSError:
+                    pass
 
         latency_ms = int((time.time() - start) * 1000)
-        out = (p.stdout or "").strip()
-        err = (p.stderr or "").strip()
+        self._last_exit_code = returncode
         self._last_err = err or out
 
-        if p.returncode != 0:
-            cat = self._classifier.classify(err or out)
+        if returncode != 0:
+            cat = self._classifier.classify(err or out, exit_code=returncode)
             raise ProviderError(self.name, cat, "provider execution failed", raw=err or out)
 
+        if last_message_path:
+            # stdout was only kept as a bounded diagnostic tail, so it cannot stand in for the answer.
+            if not final:
+                cat = self._classifier.classify(err) if err else ErrorCategory.UNKNOWN
+                raise ProviderError(self.name, cat, "empty last-message file", raw=err or out)
+            out = final
+
         # Many official CLIs print progress/status to stderr; only treat stdout as the answer.
         if not out and err:
             # If a CLI returns 0 but only prints to stderr, classify and failover conservatively.
@@ -72,5 +154,69 @@ class CliProvider(Provider):
 
         return ProviderResponse(text=out, model=model, degraded=False, latency_ms=latency_ms)
 
+    def _stream(self, run_cmd: list[str], env: dict[str, str] | None, timeout_seconds: float, keep_stdout: bool) -> tuple[int, str, str]:
+        """Run the CLI, filtering stdout line by line as it arrives.
+
+        Returns (returncode, filtered stdout, stderr). Raises a TRANSIENT
+        ProviderError if the process outlives ``timeout_seconds``; the CLI's
+        whole process group is killed then, so the call returns at the deadline.
+        """
+        filt = OutputFilter(self.output_rules, max_chars=None if keep_stdout else _DIAGNOSTIC_TAIL_CHARS)
+        proc = subprocess.Popen(
+            run_cmd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            stdin=subprocess.DEVNULL,
+            text=True,
+            encoding="utf-8",
+            errors="replace",
+            env=env,
+            # A process group of its own lets a timeout kill the whole tree, not just the wrapper.
+            **({"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP} if os.name == "nt" else {"start_new_session": True}),
+        )
+
+        def _pump_stdout() -> None:
+            for line in proc.stdout:  # type: ignore[union-attr]
+                filt.feed(line)
+
+        err_parts: list[str] = []
+        # Both pipes are drained on daemon threads: a grandchild that inherited them
+        # can keep them open after the CLI is killed, and must not hold up the deadline.
+        readers = [
+            threading.Thread(target=_pump_stdout, daemon=True),
+            threading.Thread(target=lambda: err_parts.append(proc.stderr.read()), daemon=True),  # type: ignore[union-attr]
+        ]
+        deadline = time.monotonic() + timeout_seconds
+        for t in readers:
+            t.start()
+
+        timed_out = False
+        try:
+            proc.wait(timeout=timeout_seconds)
+        except subprocess.TimeoutExpired:
+            timed_out = True
+            _kill_tree(proc)
+            proc.wait()
+
+        for t in readers:
+            t.join(_PIPE_GRACE_SECONDS if timed_out else max(0.0, deadline - time.monotonic()))
+        if any(t.is_alive() for t in readers):
+            # The CLI has exited but a descendant still holds the pipes open.
+            _kill_tree(proc)
+            for t in readers:
+                t.join(_PIPE_GRACE_SECONDS)
+        if not any(t.is_alive() for t in readers):
+            proc.stdout.close()  # type: ignore[union-attr]
+            proc.stderr.close()  # type: ignore[union-attr]
+
+        err = "".join(err_parts)
+        if timed_out:
+            self._last_err = f"Command timed out after {timeout_seconds:g} seconds"
+            raise ProviderError(self.name, ErrorCategory.TRANSIENT_NETWORK, "timeout", raw=self._last_err)
+        return proc.returncode, filt.text(), err.strip()
+
     def last_raw_error(self) -> str | None:
         return self._last_err
+
+    def last_exit_code(self) -> int | None:
+        return self._last_exit_code
@@ -1,9 +1,12 @@
 from __future__ import annotations
 
+from ..config import OutputRules
 from .cli_provider import CliProvider
 
 
 class GoogleGeminiProvider(CliProvider):
+    default_output_rules = OutputRules(drop_lines=[r"^Loaded cached credentials\.?$"])
+
     def build_command(self, prompt: str, model: str, max_output_tokens: int) -> list[str]:
         # Gemini CLI supports one-shot prompts via positional args.
         cmd: list[str] = [self.cli_cmd, "--output-format", "text"]
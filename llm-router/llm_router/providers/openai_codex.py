@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+from ..config import OutputRules
 from .cli_provider import CliProvider
 
 
@@ -10,15 +11,25 @@ class OpenAICodexProvider(CliProvider):
     and configurable; the router core is provider-agnostic.
     """
 
+    config_dir_env = "CODEX_HOME"
+    # The final answer is read from this file; stdout (banner, reasoning, tool
+    # calls) is only kept as a short tail for diagnostics.
+    last_message_flag = "--output-last-message"
+    # No section_start: that tail is diagnostics only, and errors often precede the last "codex" header.
+    default_output_rules = OutputRules(drop_lines=[r"^(?:\[[^\]]*\]\s*)?tokens used:?"])
+
     def build_command(self, prompt: str, model: str, max_output_tokens: int) -> list[str]:
         # Official Codex CLI supports non-interactive runs via `codex exec`.
-        # We'll capture the assistant's final message via `--output-last-message`.
+        # CliProvider adds `--output-last-message <tmpfile>` to capture the final message.
         #
         # Note: Codex CLI currently does not expose a stable "max output tokens" flag;
         # we keep it in the router API but do not enforce it here.
         cmd: list[str] = [self.cli_cmd, "exec", "--skip-git-repo-check", "--sandbox", "read-only"]
         if model:
             cmd += ["--model", model]
+        # `codex exec resume` needs the session id Codex generates (or `--last`, which is
+        # unsafe with concurrent sessions), so sessions use compact replay for Codex.
+        #
         # prompt is the trailing argument
         cmd += [prompt]
         return cmd
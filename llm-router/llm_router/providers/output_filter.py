@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import re
+
+from ..config import OutputRules
+
+
+# CSI/OSC escape sequences plus stray single-character escapes.
+_ANSI = re.compile(r"\x1b(?:\[[0-?]*[ -/]*[@-~]|\][^\x07\x1b]*(?:\x07|\x1b\\)|[@-Z\\-_])")
+
+
+def strip_ansi(text: str) -> str:
+    return _ANSI.sub("", text)
+
+
+class OutputFilter:
+    """Incremental line filter applied to CLI stdout as it arrives.
+
+    Each line is cleaned once (ANSI codes, carriage-return progress redraws),
+    dropped if it matches a noise rule, and otherwise appended. A
+    ``section_start`` match discards everything kept so far, so only the
+    final section survives. With ``max_chars`` only a bounded tail is kept
+    (used when the answer comes from elsewhere and stdout is diagnostics).
+    """
+
+    def __init__(self, rules: OutputRules, max_chars: int | None = None):
+        self._strip_ansi = rules.strip_ansi
+        self._drop = re.compile("|".join(f"(?:{p})" for p in rules.drop_lines)) if rules.drop_lines else None
+        self._section = re.compile(rules.section_start) if rules.section_start else None
+        self._max_chars = max_chars
+        self._lines: list[str] = []
+        self._size = 0
+
+    def feed(self, line: str) -> None:
+        line = line.rstrip("\r\n")
+        if "\r" in line:
+            # Progress bars redraw with \r; only the final state matters.
+            line = line.rsplit("\r", 1)[-1]
+        if self._strip_ansi and "\x1b" in line:
+            line = strip_ansi(line)
+
+        if self._section is not None and self._section.search(line):
+            self._lines.clear()
+            self._size = 0
+            return
+        if self._drop is not None and self._drop.search(line):
+            return
+
+        self._lines.append(line)
+        self._size += len(line) + 1
+        if self._max_chars is not None:
+            while self._size > self._max_chars and len(self._lines) > 1:
+                self._size -= len(self._lines.pop(0)) + 1
+
+    def text(self) -> str:
+        return "\n".join(self._lines).strip()
@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import random
+import threading
+import time
+from pathlib import Path
+from typing import IO, Any, Callable
+
+from ..config import CredentialProfile
+from ..errors import ErrorCategory, ProviderError
+from ..redact import redact
+from .base import Provider, ProviderResponse, ResumeToken
+
+
+def prompt_hash(prompt: str) -> str:
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:16]
+
+
+def _open(path: Path, mode: str) -> IO[str]:
+    # `.gz` recordings are gzip-compressed JSONL; anything else is plain JSONL.
+    if path.suffix == ".gz":
+        return gzip.open(path, mode + "t", encoding="utf-8")  # type: ignore[return-value]
+    return path.open(mode, encoding="utf-8")
+
+
+# Every provider wrapped with the same ``--record`` path appends to one file, often
+# concurrently under fan-out, so writers share a lock per resolved path.
+_PATH_LOCKS: dict[Path, threading.Lock] = {}
+_PATH_LOCKS_GUARD = threading.Lock()
+
+
+def _path_lock(path: Path) -> threading.Lock:
+    with _PATH_LOCKS_GUARD:
+        return _PATH_LOCKS.setdefault(path.resolve(), threading.Lock())
+
+
+def load_recording(path: str | Path) -> list[dict[str, Any]]:
+    p = Path(path).expanduser()
+    with _open(p, "r") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+class RecordingProvider(Provider):
+    """Wraps a real provider and appends every interaction to a recording file.
+
+    Prompts are stored only as a hash, and text fields are redacted like the
+    logs, since recordings are meant to be checked in. Each record holds: provider, prompt_sha,
+    model, latency_ms, ok, text (stdout), category/raw (stderr) and exit_code.
+    """
+
+    def __init__(self, inner: Provider, path: str | Path):
+        self.inner = inner
+        self.name = inner.name
+        self.path = Path(path).expanduser()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = _path_lock(self.path)
+
+    def _append(self, rec: dict[str, Any]) -> None:
+        with self._lock, _open(self.path, "a") as f:
+            f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+
+    def supports_resume(self) -> bool:
+        return self.inner.supports_resume()
+
+    def run(
+        self,
+        prompt: str,
+        model: str,
+        timeout_seconds: float,
+        max_output_tokens: int,
+        profile: CredentialProfile | None = None,
+        session: ResumeToken | None = None,
+    ) -> ProviderResponse:
+        rec: dict[str, Any] = {"provider": self.name, "prompt_sha": prompt_hash(prompt), "model": model}
+        start = time.monotonic()
+        kwargs: dict[str, Any] = {}
+        if profile is not None:
+            kwargs["profile"] = profile
+        if session is not None:
+            kwargs["session"] = session
+        try:
+            resp = self.inner.run(prompt, model, timeout_seconds, max_output_tokens, **kwargs)
+        except ProviderError as e:
+            rec.update(
+                latency_ms=int((time.monotonic() - start) * 1000),
+                ok=False,
+                category=e.category.value,
+                message=redact(e.message),
+                raw=redact(e.raw) if e.raw else e.raw,
+                exit_code=self.inner.last_exit_code(),
+            )
+            self._append(rec)
+            raise
+        rec.update(latency_ms=resp.latency_ms, ok=True, text=redact(resp.text), exit_code=self.inner.last_exit_code())
+        self._append(rec)
+        return resp
+
+    def last_raw_error(self) -> str | None:
+        return self.inner.last_raw_error()
+
+    def last_exit_code(self) -> int | None:
+        return self.inner.last_exit_code()
+
+
+class ReplayProvider(Provider):
+    """Deterministically replays recorded interactions for one provider.
+
+    Records matching the prompt hash are replayed in order (cycling); prompts
+    that were never recorded replay the provider's records round-robin. With
+    ``latency="recorded"`` each call sleeps for its record's latency times
+    ``latency_scale``; ``latency="sampled"`` draws from the provider's recorded
+    latency distribution with a seeded RNG instead.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        path: str | Path,
+        *,
+        latency: str = "recorded",
+        latency_scale: float = 1.0,
+        seed: int = 0,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        if latency not in ("recorded", "sampled"):
+            raise ValueError(f"unknown replay latency mode: {latency}")
+        self.name = name
+        self.records = [r for r in load_recording(path) if r.get("provider") == name]
+        if not self.records:
+            raise ValueError(f"no recorded interactions for {name} in {path}")
+        self.latency = latency
+        self.latency_scale = latency_scale
+        self._sleep = sleep
+        self._rng = random.Random(seed)
+        self._by_prompt: dict[str, list[dict[str, Any]]] = {}
+        for r in self.records:
+            self._by_prompt.setdefault(r.get("prompt_sha", ""), []).append(r)
+        self._cursor: dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._last_err: str | None = None
+        self._last_exit_code: int | None = None
+
+    def _next_record(self, sha: str) -> tuple[dict[str, Any], float]:
+        with self._lock:
+            pool = self._by_prompt.get(sha) or self.records
+            key = sha if sha in self._by_prompt else ""
+            i = self._cursor.get(key, 0)
+            self._cursor[key] = i + 1
+            rec = pool[i % len(pool)]
+            if self.latency == "sampled":
+                latency_ms = self._rng.choice(self.records).get("latency_ms", 0)
+            else:
+                latency_ms = rec.get("latency_ms", 0)
+        return rec, latency_ms * self.latency_scale / 1000.0
+
+    def run(
+        self,
+        prompt: str,
+        model: str,
+        timeout_seconds: float,
+        max_output_tokens: int,
+        profile: CredentialProfile | None = None,
+        session: ResumeToken | None = None,
+    ) -> ProviderResponse:
+        rec, latency_s = self._next_record(prompt_hash(prompt))
+
+        if latency_s > timeout_seconds:
+            # Mirror CliProvider: the subprocess would have been killed at the timeout.
+            self._sleep(timeout_seconds)
+            self._last_err = "timeout"
+            self._last_exit_code = None
+            raise ProviderError(self.name, ErrorCategory.TRANSIENT_NETWORK, "timeout", raw=self._last_err)
+
+        self._sleep(latency_s)
+        self._last_exit_code = rec.get("exit_code")
+        if not rec.get("ok"):
+            self._last_err = rec.get("raw") or rec.get("message")
+            raise ProviderError(self.name, ErrorCategory(rec.get("category", "unknown")), rec.get("message") or "replayed error", raw=rec.get("raw"))
+
+        self._last_err = None
+        return ProviderResponse(text=rec.get("text", ""), model=model or rec.get("model", ""), degraded=False, latency_ms=int(latency_s * 1000))
+
+    def last_raw_error(self) -> str | None:
+        return self._last_err
+
+    def last_exit_code(self) -> int | None:
+        return self._last_exit_code
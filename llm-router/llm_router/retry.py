@@ -0,0 +1,12 @@
+from __future__ import annotations
+
+import random
+
+from .config import RetryPolicy
+
+
+def backoff_delay(policy: RetryPolicy, attempt: int, rng: random.Random | None = None) -> float:
+    """Full-jitter exponential backoff delay before retry number ``attempt`` (1-based)."""
+    r = rng or random
+    cap = min(policy.max_delay_seconds, policy.base_delay_seconds * (2 ** max(0, attempt - 1)))
+    return r.uniform(0.0, max(0.0, cap))
@@ -1,12 +1,25 @@
 from __future__ import annotations
 
+import queue
+import random
+import statistics
+import threading
+import time
+from collections import deque
 from dataclasses import dataclass
+from typing import Any
 
+from .cache import SimilarityCache
 from .classifier import ErrorClassifier
-from .config import Config
+from .config import Budget, Config, CredentialProfile
+from .credentials import CredentialPool
 from .errors import ErrorCategory, ProviderError
+from .fanout import ConsensusResult, FanoutResult, MergeStrategy, resolve_strategy
 from .logging import JsonlLogger, LogEvent, now_ts
-from .providers.base import Provider, ProviderResponse
+from .providers.base import Provider, ProviderResponse, ResumeToken
+from .retry import backoff_delay
+from .session import Session
+from .usage import UsageLedger, estimate_tokens
 
 
 @dataclass
@@ -17,11 +30,37 @@ class RouteDecision:
 
 
 class Router:
-    def __init__(self, cfg: Config, providers: dict[str, Provider], logger: JsonlLogger):
+    _LATENCY_WINDOW = 50
+
+    def __init__(
+        self,
+        cfg: Config,
+        providers: dict[str, Provider],
+        logger: JsonlLogger,
+        cache: SimilarityCache | None = None,
+        ledger: UsageLedger | None = None,
+    ):
         self.cfg = cfg
         self.providers = providers
         self.logger = logger
         self.classifier = ErrorClassifier()
+        self.cache = cache if cache is not None else SimilarityCache.from_config(cfg.router.cache)
+        if ledger is None and cfg.router.usage_enabled:
+            ledger = UsageLedger(logger.log_dir / "usage.sqlite3")
+        self.ledger = ledger
+        # Fail on a bad consensus.merge at startup rather than on the first fan-out.
+        resolve_strategy(cfg.router.consensus_merge)
+        # Injectable for tests.
+        self._clock = time.monotonic
+        self._sleep = time.sleep
+        self._rng = random.Random()
+        # Recent successful latencies (ms) per provider, for deadline-aware skipping.
+        self._latencies: dict[str, deque[int]] = {}
+        self._pools: dict[str, CredentialPool] = {}
+        for name, pcfg in cfg.providers.items():
+            pool = CredentialPool.from_config(pcfg)
+            if pool:
+                self._pools[name] = pool
 
     def _should_failover(self, err: ProviderError) -> bool:
         return err.category in {
@@ -41,11 +80,143 @@ class Router:
 
         return primary or degraded_model or "", False
 
-    def run(self, prompt: str, *, force_provider: str | None = None, verbose: bool = False, log_prompts: bool = False, max_output_tokens: int | None = None) -> ProviderResponse:
-        ordered = [force_provider] if force_provider else list(self.cfg.router.providers)
+    def _retry_delay(self, category: ErrorCategory, attempt: int, started: float, deadline_at: float | None) -> float | None:
+        """Return the sleep before the next attempt on the same provider, or None to stop retrying."""
+        policy = self.cfg.router.retry.get(category.value)
+        if policy is None or attempt >= policy.max_attempts:
+            return None
+
+        delay = backoff_delay(policy, attempt, self._rng)
+        now = self._clock()
+        if policy.budget_seconds is not None and (now - started) + delay >= policy.budget_seconds:
+            return None
+        if deadline_at is not None and now + delay >= deadline_at:
+            return None
+        return delay
+
+    def _remaining(self, deadline_at: float | None) -> float | None:
+        if deadline_at is None:
+            return None
+        return deadline_at - self._clock()
+
+    def _record_latency(self, provider_name: str, latency_ms: int) -> None:
+        self._latencies.setdefault(provider_name, deque(maxlen=self._LATENCY_WINDOW)).append(latency_ms)
+
+    def p50_latency_seconds(self, provider_name: str) -> float | None:
+        """Median of recent successful latencies for ``provider_name`` (None until observed)."""
+        samples = self._latencies.get(provider_name)
+        if not samples:
+            return None
+        return statistics.median(samples) / 1000.0
+
+    def _acquire_profile(
+        self, p_name: str, pool: CredentialPool, budgets: list[Budget], exclude: set[str], shift_at: float
+    ) -> tuple[CredentialProfile | None, float, bool]:
+        """Next usable profile whose own budgets are below ``shift_at``.
+
+        Returns the profile (None if none qualifies), its budget utilization,
+        and whether any profile was passed over for being over budget.
+        """
+        skip = set(exclude)
+        over_budget = False
+        while True:
+            profile = pool.acquire(self._clock(), exclude=skip)
+            own = [b for b in budgets if profile is not None and b.credential == profile.name]
+            if profile is None or not own or self.ledger is None:
+                return profile, 0.0, over_budget
+            used = self.ledger.utilization(p_name, own)
+            if used < shift_at:
+                return profile, used, over_budget
+            skip.add(profile.name)
+            over_budget = True
+            self.logger.write(LogEvent(ts=now_ts(), kind="skip", provider=p_name, reason="budget_exhausted", credential=profile.name))
+
+    def _budget_exhausted(self, p_name: str) -> bool:
+        """True if ``p_name`` is past ``usage_shift_at`` on its shared budgets, or on every credential's own."""
+        pcfg = self.cfg.providers.get(p_name)
+        if not self.ledger or not pcfg or not pcfg.budgets:
+            return False
+        shift_at = self.cfg.router.usage_shift_at
+        shared = [b for b in pcfg.budgets if not b.credential]
+        if shared and self.ledger.utilization(p_name, shared) >= shift_at:
+            return True
+        pool = self._pools.get(p_name)
+        if pool is None:
+            return False
+        for profile in pool.profiles:
+            own = [b for b in pcfg.budgets if b.credential == profile.name]
+            if not own or self.ledger.utilization(p_name, own) < shift_at:
+                return False
+        return True
+
+    def _deadline_error(self, deadline: float, last_error: ProviderError | None) -> ProviderError:
+        return ProviderError(
+            provider="router",
+            category=ErrorCategory.DEADLINE_EXCEEDED,
+            message=f"Deadline of {deadline:g}s exceeded before any provider answered.",
+            raw=(str(last_error) if last_error else None),
+        )
+
+    def run(
+        self,
+        prompt: str,
+        *,
+        force_provider: str | None = None,
+        verbose: bool = False,
+        log_prompts: bool = False,
+        max_output_tokens: int | None = None,
+        deadline: float | None = None,
+        use_cache: bool = True,
+        providers: list[str] | None = None,
+        session: ResumeToken | None = None,
+        respect_budgets: bool | None = None,
+    ) -> ProviderResponse:
+        """Run ``prompt`` with per-provider retries and failover.
+
+        ``deadline`` is an overall budget in seconds covering every attempt,
+        retry sleep and failover. Each attempt gets the smaller of the provider
+        timeout and the remaining budget; providers whose observed p50 latency
+        exceeds the remaining budget are skipped.
+
+        With a similarity cache configured, near-duplicate prompts are answered
+        from it and logged as ``cache_hit`` events.
+
+        ``providers`` overrides the configured order for this call. ``session``
+        is forwarded to providers that support native resume (see ``session()``).
+
+        Local budgets are ignored for a provider the caller forced, unless
+        ``respect_budgets`` is true (internal single-provider dispatch from
+        fan-out and sessions).
+        """
+        if respect_budgets is None:
+            respect_budgets = not force_provider
+        # A forced provider must answer itself; cache entries may come from any provider.
+        if self.cache and use_cache and not force_provider:
+            t0 = self._clock()
+            hit = self.cache.lookup(prompt)
+            if hit:
+                latency_ms = int((self._clock() - t0) * 1000)
+                self.logger.write(
+                    LogEvent(
+                        ts=now_ts(),
+                        kind="cache_hit",
+                        provider=hit.provider,
+                        model=hit.model,
+                        latency_ms=latency_ms,
+                        similarity=round(hit.similarity, 4),
+                        reason=f"entry:{hit.entry_id}",
+                        prompt=prompt if log_prompts else None,
+                    )
+                )
+                return ProviderResponse(text=hit.text, model=hit.model, degraded=False, latency_ms=latency_ms, cached=True, provider=hit.provider)
+
+        ordered = [force_provider] if force_provider else list(providers or self.cfg.router.providers)
+        deadline_at = (self._clock() + deadline) if deadline is not None else None
 
         last_limit_like = False
         last_error: ProviderError | None = None
+        deadline_hit = False  # the budget actually ran out
+        deadline_skipped = False  # some provider was skipped as too slow for the remaining budget
 
         for i, p_name in enumerate(ordered):
             if not p_name:
@@ -54,74 +225,311 @@ class Router:
             if not provider:
                 continue
 
+            remaining = self._remaining(deadline_at)
+            if remaining is not None:
+                if remaining <= 0:
+                    deadline_hit = True
+                    break
+                p50 = self.p50_latency_seconds(p_name)
+                if p50 is not None and remaining < p50:
+                    deadline_skipped = True
+                    self.logger.write(LogEvent(ts=now_ts(), kind="skip", provider=p_name, reason="deadline_below_p50"))
+                    if verbose:
+                        print(f"[{p_name}] skipped: {remaining:.1f}s left < p50 {p50:.1f}s")
+                    continue
+
             # Near-limit heuristic: if previous provider hit rate/quota, degrade next attempt.
-            model, degraded = self._pick_model(p_name, near_limit=last_limit_like)
-            out_tokens = max_output_tokens or (self.cfg.router.degrade_max_output_tokens if degraded else 1200)
+            near_limit = last_limit_like
+            degrade_reason = "degraded_after_limit"
 
-            self.logger.write(
-                LogEvent(
-                    ts=now_ts(),
-                    kind="attempt",
-                    provider=p_name,
-                    model=model,
-                    degraded=degraded,
-                    reason=("degraded_after_limit" if degraded else None),
-                    prompt=prompt if log_prompts else None,
+            # Local budgets: degrade before the hard limit, then shift traffic elsewhere.
+            # Budgets scoped to one credential are checked when that profile is acquired.
+            pcfg = self.cfg.providers.get(p_name)
+            budgets = pcfg.budgets if self.ledger and pcfg else []
+            shared = [b for b in budgets if not b.credential]
+            used = self.ledger.utilization(p_name, shared) if self.ledger and shared else 0.0
+            if used >= self.cfg.router.usage_shift_at and respect_budgets:
+                last_error = ProviderError(p_name, ErrorCategory.QUOTA_EXHAUSTED, f"local budget {used:.0%} used")
+                last_limit_like = True
+                self.logger.write(LogEvent(ts=now_ts(), kind="skip", provider=p_name, reason="budget_exhausted"))
+                if verbose:
+                    print(f"[{p_name}] skipped: {used:.0%} of budget used")
+                continue
+
+            pool = self._pools.get(p_name)
+            resume = session if session is not None and provider.supports_resume() else None
+            # A native session lives under one account, so a resumed turn keeps its profile.
+            pinned = pool is not None and resume is not None and resume.profile is not None
+            shift_at = self.cfg.router.usage_shift_at if respect_budgets else float("inf")
+            over_budget = False
+            if pinned:
+                profile = resume.profile
+            elif pool:
+                profile, profile_used, over_budget = self._acquire_profile(p_name, pool, budgets, set(), shift_at)
+                used = max(used, profile_used)
+            else:
+                profile = None
+            # Each profile gets at most one turn per run, however short its cooldown.
+            tried: set[str] = {profile.name} if profile else set()
+            if pool and profile is None:
+                last_error = ProviderError(
+                    p_name,
+                    ErrorCategory.QUOTA_EXHAUSTED,
+                    "local budget used on every credential profile" if over_budget else "all credential profiles are cooling down",
                 )
-            )
+                last_limit_like = True
+                skip_reason = "budget_exhausted" if over_budget else "credentials_cooling_down"
+                self.logger.write(LogEvent(ts=now_ts(), kind="skip", provider=p_name, reason=skip_reason))
+                if verbose:
+                    print(f"[{p_name}] skipped: {skip_reason.replace('_', ' ')}")
+                continue
+
+            if used >= self.cfg.router.usage_degrade_at and not near_limit:
+                near_limit = True
+                degrade_reason = "degraded_near_budget"
+
+            model, degraded = self._pick_model(p_name, near_limit=near_limit)
+            out_tokens = max_output_tokens or (self.cfg.router.degrade_max_output_tokens if degraded else 1200)
+
+            started = self._clock()
+            attempt = 0
+            while True:
+                attempt += 1
+                timeout: float = self.cfg.router.timeout_seconds
+                remaining = self._remaining(deadline_at)
+                if remaining is not None:
+                    if remaining <= 0:
+                        break
+                    timeout = min(timeout, remaining)
 
-            try:
-                resp = provider.run(prompt=prompt, model=model, timeout_seconds=self.cfg.router.timeout_seconds, max_output_tokens=out_tokens)
-                resp.degraded = degraded
                 self.logger.write(
                     LogEvent(
                         ts=now_ts(),
-                        kind="success",
+                        kind="attempt",
                         provider=p_name,
                         model=model,
-                        latency_ms=resp.latency_ms,
                         degraded=degraded,
+                        reason=("retry" if attempt > 1 else degrade_reason if degraded else None),
+                        attempt=attempt,
+                        credential=profile.name if profile else None,
+                        prompt=prompt if log_prompts else None,
                     )
                 )
-                return resp
-            except ProviderError as e:
-                last_error = e
-                cat = e.category
 
-                self.logger.write(
-                    LogEvent(
-                        ts=now_ts(),
-                        kind="error",
-                        provider=p_name,
-                        model=model,
-                        degraded=degraded,
-                        error_category=cat.value,
-                        error_message=e.raw or e.message,
-                        reason="failover" if (i < len(ordered) - 1) else "final",
+                # Optional arguments are only passed to providers that opted in.
+                extra: dict[str, Any] = {}
+                if profile is not None:
+                    extra["profile"] = profile
+                if resume is not None:
+                    extra["session"] = resume
+
+                try:
+                    resp = provider.run(prompt=prompt, model=model, timeout_seconds=timeout, max_output_tokens=out_tokens, **extra)
+                    resp.degraded = degraded
+                    resp.provider = p_name
+                    if resume is not None:
+                        resume.profile = profile
+                    if self.ledger:
+                        self.ledger.record(
+                            p_name,
+                            model,
+                            credential=profile.name if profile else None,
+                            input_tokens=estimate_tokens(prompt),
+                            output_tokens=estimate_tokens(resp.text),
+                        )
+                    self._record_latency(p_name, resp.latency_ms)
+                    # Degraded answers are not cached so a later full-quality run can replace them.
+                    if self.cache and use_cache and not degraded:
+                        self.cache.store(prompt, resp.text, provider=p_name, model=model)
+                    self.logger.write(
+                        LogEvent(
+                            ts=now_ts(),
+                            kind="success",
+                            provider=p_name,
+                            model=model,
+                            latency_ms=resp.latency_ms,
+                            degraded=degraded,
+                            attempt=attempt,
+                            credential=profile.name if profile else None,
+                        )
                     )
-                )
+                    return resp
+                except ProviderError as e:
+                    last_error = e
+                    cat = e.category
+                    if self.ledger:
+                        # Failed attempts still count against request budgets.
+                        self.ledger.record(
+                            p_name,
+                            model,
+                            credential=profile.name if profile else None,
+                            input_tokens=estimate_tokens(prompt),
+                            ok=False,
+                            error_category=cat.value,
+                        )
+                    delay = self._retry_delay(cat, attempt, started, deadline_at)
+                    remaining = self._remaining(deadline_at)
 
-                if verbose:
-                    print(f"[{p_name}] {cat.value}: {e.message}")
+                    # A limited credential cools down; try the next profile before failing over.
+                    next_profile = None
+                    if pool and profile and cat in {ErrorCategory.RATE_LIMITED, ErrorCategory.QUOTA_EXHAUSTED}:
+                        now = self._clock()
+                        pool.mark_limited(profile, cat, now)
+                        if delay is None and not pinned:
+                            next_profile, _, _ = self._acquire_profile(p_name, pool, budgets, tried, shift_at)
 
-                last_limit_like = cat in {ErrorCategory.RATE_LIMITED, ErrorCategory.QUOTA_EXHAUSTED}
+                    if delay is not None:
+                        reason = "retry"
+                    elif remaining is not None and remaining <= 0:
+                        reason = "deadline_exceeded"
+                    elif next_profile is not None:
+                        reason = "next_credential"
+                    else:
+                        reason = "failover" if (i < len(ordered) - 1) else "final"
 
-                if force_provider:
-                    raise
-                if self._should_failover(e):
-                    continue
-                raise
+                    self.logger.write(
+                        LogEvent(
+                            ts=now_ts(),
+                            kind="error",
+                            provider=p_name,
+                            model=model,
+                            degraded=degraded,
+                            error_category=cat.value,
+                            error_message=e.raw or e.message,
+                            reason=reason,
+                            attempt=attempt,
+                            credential=profile.name if profile else None,
+                        )
+                    )
+
+                    if verbose:
+                        print(f"[{p_name}] {cat.value}: {e.message}" + (f" (retrying in {delay:.2f}s)" if delay is not None else ""))
+
+                    if reason == "next_credential":
+                        # A fresh profile starts with a fresh retry budget.
+                        profile = next_profile
+                        tried.add(profile.name)
+                        attempt = 0
+                        started = self._clock()
+                        continue
+                    if delay is None:
+                        break
+                    self._sleep(delay)
+
+            remaining = self._remaining(deadline_at)
+            if remaining is not None and remaining <= 0:
+                deadline_hit = True
+                break
+
+            assert last_error is not None
+            last_limit_like = last_error.category in {ErrorCategory.RATE_LIMITED, ErrorCategory.QUOTA_EXHAUSTED}
+
+            if force_provider:
+                raise last_error
+            if self._should_failover(last_error):
+                continue
+            raise last_error
+
+        # p50 skips only count as a deadline failure when nothing else was tried.
+        if deadline is not None and (deadline_hit or (deadline_skipped and last_error is None)):
+            raise self._deadline_error(deadline, last_error)
 
         # If we got here, we failed across all providers.
-        if last_error and last_error.category in {ErrorCategory.RATE_LIMITED, ErrorCategory.QUOTA_EXHAUSTED}:
-            raise ProviderError(
+        raise self._all_failed_error([last_error] if last_error else [])
+
+    def _all_failed_error(self, errors: list[ProviderError]) -> ProviderError:
+        limit_like = {ErrorCategory.RATE_LIMITED, ErrorCategory.QUOTA_EXHAUSTED}
+        if errors and all(e.category in limit_like for e in errors):
+            return ProviderError(
                 provider="router",
                 category=ErrorCategory.QUOTA_EXHAUSTED,
                 message="All providers are currently at usage limits. Try again later or reduce request size.",
             )
 
-        raise ProviderError(
+        return ProviderError(
             provider="router",
             category=ErrorCategory.UNKNOWN,
             message="All providers failed. Try again later or check provider auth/health.",
         )
+
+    def session(self) -> Session:
+        """Start a multi-turn conversation (see ``Session``)."""
+        r = self.cfg.router
+        return Session(router=self, max_context_chars=r.session_max_context_chars, recent_turns=r.session_recent_turns)
+
+    def fanout(
+        self,
+        prompt: str,
+        *,
+        n: int | None = None,
+        merge: str | MergeStrategy | None = None,
+        k: int | None = None,
+        providers: list[str] | None = None,
+        verbose: bool = False,
+        log_prompts: bool = False,
+        max_output_tokens: int | None = None,
+        deadline: float | None = None,
+    ) -> ConsensusResult:
+        """Run ``prompt`` on ``n`` providers concurrently and merge the answers.
+
+        Each provider runs through ``run(force_provider=...)`` so retries,
+        credential pools, budgets and the deadline still apply, but the cache
+        is bypassed. Providers over their local budget are passed over in
+        favour of the next ones in order. Wall time is that of the slowest provider, or of the k-th
+        answer for ``first_k``.
+        """
+        r = self.cfg.router
+        candidates = [p for p in (providers or r.providers) if p in self.providers]
+        spent = [p for p in candidates if self._budget_exhausted(p)]
+        names = [p for p in candidates if p not in spent][: n or r.consensus_n]
+        if not names and spent:
+            raise self._all_failed_error([ProviderError(p, ErrorCategory.QUOTA_EXHAUSTED, "local budget used") for p in spent])
+        merge = merge or r.consensus_merge
+        k = k or r.consensus_k
+        strategy = resolve_strategy(merge)
+        strategy_name = merge if isinstance(merge, str) else getattr(merge, "__name__", "custom")
+
+        def one(p_name: str) -> FanoutResult:
+            t0 = self._clock()
+            try:
+                resp = self.run(
+                    prompt,
+                    force_provider=p_name,
+                    verbose=verbose,
+                    log_prompts=log_prompts,
+                    max_output_tokens=max_output_tokens,
+                    deadline=deadline,
+                    use_cache=False,
+                    respect_budgets=True,
+                )
+                return FanoutResult(provider=p_name, latency_ms=int((self._clock() - t0) * 1000), response=resp)
+            except ProviderError as e:
+                return FanoutResult(provider=p_name, latency_ms=int((self._clock() - t0) * 1000), error=e)
+
+        # Daemon threads, so stragglers left behind by first_k never hold up interpreter exit.
+        done: queue.Queue[FanoutResult] = queue.Queue()
+        for p_name in names:
+            threading.Thread(target=lambda p=p_name: done.put(one(p)), name=f"llm-fanout-{p_name}", daemon=True).start()
+
+        results: list[FanoutResult] = []
+        for _ in names:
+            results.append(done.get())
+            if strategy_name == "first_k" and sum(x.response is not None for x in results) >= k:
+                break
+
+        chosen = strategy(results, k)
+        ok = sum(x.response is not None for x in results)
+        self.logger.write(
+            LogEvent(
+                ts=now_ts(),
+                kind="consensus",
+                provider=chosen.provider if chosen else None,
+                model=chosen.response.model if chosen and chosen.response else None,
+                latency_ms=max((x.latency_ms for x in results), default=0),
+                reason=f"{strategy_name}:{ok}/{len(names)}",
+            )
+        )
+        if chosen is None or chosen.response is None:
+            raise self._all_failed_error([x.error for x in results if x.error])
+
+        return ConsensusResult(merged=chosen.response, provider=chosen.provider, strategy=strategy_name, results=results)
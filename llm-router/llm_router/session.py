@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import uuid
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
+
+from .errors import ErrorCategory, ProviderError
+from .logging import LogEvent, now_ts
+from .providers.base import ProviderResponse, ResumeToken
+
+if TYPE_CHECKING:
+    from .router import Router
+
+
+@dataclass
+class Turn:
+    role: str  # "user" | "assistant"
+    text: str
+
+
+@dataclass
+class Session:
+    """Multi-turn conversation pinned to one provider while it stays healthy.
+
+    On a provider with native resume only the new message is sent each turn.
+    Elsewhere, and after a failover, the prompt is a compact replay: the last
+    ``recent_turns`` turns verbatim, then as many older turns (condensed) as
+    fit in ``max_context_chars``. Per-turn cost therefore stays flat instead
+    of growing with the conversation.
+    """
+
+    router: Router
+    max_context_chars: int = 8000
+    recent_turns: int = 4
+    condensed_turn_chars: int = 200
+    history: list[Turn] = field(default_factory=list)
+    provider: str | None = None
+    _token: ResumeToken | None = None  # set while the pinned provider holds native history
+
+    def send(self, message: str, **run_kwargs) -> ProviderResponse:
+        """Send one user turn; ``run_kwargs`` are passed to ``Router.run``."""
+        run_kwargs.setdefault("use_cache", False)
+        exclude: str | None = None
+        native_error: ProviderError | None = None
+        # One deadline covers the whole turn, native attempt and replay together.
+        deadline = run_kwargs.pop("deadline", None)
+        deadline_at = self.router._clock() + deadline if deadline is not None else None
+
+        if self._token is not None and self.provider:
+            try:
+                resp = self.router.run(
+                    message, force_provider=self.provider, session=self._token, respect_budgets=True, deadline=deadline, **run_kwargs
+                )
+            except ProviderError as e:
+                if e.category == ErrorCategory.DEADLINE_EXCEEDED:
+                    raise
+                self._log("session_failover", e)
+                native_error = e
+                exclude = self.provider
+                self._token = None
+            else:
+                self._token.turn += 1
+                return self._record(message, resp)
+
+        # Compact replay, preferring the pinned provider. A fresh token lets a
+        # resume-capable provider pick the conversation up natively from here on.
+        order = list(self.router.cfg.router.providers)
+        if self.provider:
+            order = [self.provider] + [p for p in order if p != self.provider]
+        if exclude:
+            order = [p for p in order if p != exclude] or [exclude]
+        token = ResumeToken(id=str(uuid.uuid4()))
+        remaining = deadline_at - self.router._clock() if deadline_at is not None else None
+        if remaining is not None and remaining <= 0:
+            raise self.router._deadline_error(deadline, native_error)
+        resp = self.router.run(self.compact_prompt(message), providers=order, session=token, deadline=remaining, **run_kwargs)
+
+        self.provider = resp.provider
+        p = self.router.providers.get(resp.provider or "")
+        if p is not None and p.supports_resume():
+            token.turn = 1
+            self._token = token
+        return self._record(message, resp)
+
+    def compact_prompt(self, message: str) -> str:
+        if not self.history:
+            return message
+
+        recent = self.history[-self.recent_turns :]
+        older = self.history[: -self.recent_turns] if len(self.history) > self.recent_turns else []
+        lines = [f"{t.role.capitalize()}: {t.text}" for t in recent]
+        budget = self.max_context_chars - sum(len(x) + 1 for x in lines)
+
+        condensed: list[str] = []
+        for t in reversed(older):
+            text = " ".join(t.text.split())
+            if len(text) > self.condensed_turn_chars:
+                text = text[: self.condensed_turn_chars - 3] + "..."
+            line = f"{t.role.capitalize()}: {text}"
+            if budget - len(line) - 1 < 0:
+                break
+            budget -= len(line) + 1
+            condensed.append(line)
+        condensed.reverse()
+
+        parts = ["Conversation so far" + (" (older turns condensed)" if older else "") + ":"]
+        parts += condensed + lines
+        parts += ["", "Current request:", message]
+        return "\n".join(parts)
+
+    def _record(self, message: str, resp: ProviderResponse) -> ProviderResponse:
+        self.history.append(Turn("user", message))
+        self.history.append(Turn("assistant", resp.text))
+        return resp
+
+    def _log(self, kind: str, err: ProviderError) -> None:
+        self.router.logger.write(
+            LogEvent(
+                ts=now_ts(),
+                kind=kind,
+                provider=self.provider,
+                error_category=err.category.value,
+                error_message=err.raw or err.message,
+                reason="native_resume_failed",
+            )
+        )
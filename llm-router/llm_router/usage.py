@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import math
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+from .config import Budget
+
+
+_GROUP_COLUMNS = ("provider", "model", "credential")
+
+
+def estimate_tokens(text: str | None) -> int:
+    # ~4 characters per token is close enough for budgeting across providers.
+    return math.ceil(len(text) / 4) if text else 0
+
+
+@dataclass
+class UsageRow:
+    key: tuple[str, ...]
+    requests: int
+    errors: int
+    input_tokens: int
+    output_tokens: int
+
+
+class UsageLedger:
+    """Local, append-only usage ledger (SQLite, indexed by provider and time).
+
+    One row per provider attempt with estimated input/output tokens, so usage
+    can be summed over any time window per provider, model and credential.
+    """
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.executescript(
+            """
+            PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS usage (
+                ts REAL NOT NULL,
+                provider TEXT NOT NULL,
+                model TEXT NOT NULL,
+                credential TEXT NOT NULL,
+                input_tokens INTEGER NOT NULL,
+                output_tokens INTEGER NOT NULL,
+                ok INTEGER NOT NULL,
+                error_category TEXT
+            );
+            CREATE INDEX IF NOT EXISTS usage_provider_ts ON usage(provider, ts);
+            CREATE INDEX IF NOT EXISTS usage_ts ON usage(ts);
+            """
+        )
+
+    def record(
+        self,
+        provider: str,
+        model: str,
+        *,
+        credential: str | None = None,
+        input_tokens: int = 0,
+        output_tokens: int = 0,
+        ok: bool = True,
+        error_category: str | None = None,
+        ts: float | None = None,
+    ) -> None:
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT INTO usage VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (ts if ts is not None else time.time(), provider, model or "", credential or "", input_tokens, output_tokens, int(ok), error_category),
+            )
+
+    def totals(self, provider: str, since: float, model: str | None = None, credential: str | None = None) -> tuple[int, int]:
+        """(requests, input+output tokens) for ``provider`` since ``since``."""
+        sql = "SELECT COUNT(*), COALESCE(SUM(input_tokens + output_tokens), 0) FROM usage WHERE provider = ? AND ts >= ?"
+        params: list[object] = [provider, since]
+        if model:
+            sql += " AND model = ?"
+            params.append(model)
+        if credential:
+            sql += " AND credential = ?"
+            params.append(credential)
+        with self._lock:
+            requests, tokens = self._db.execute(sql, params).fetchone()
+        return int(requests), int(tokens)
+
+    def utilization(self, provider: str, budgets: list[Budget], now: float | None = None) -> float:
+        """Highest fraction of any budget used for ``provider`` (0.0 with no budgets)."""
+        now = now if now is not None else time.time()
+        worst = 0.0
+        for b in budgets:
+            requests, tokens = self.totals(provider, now - b.window_seconds, model=b.model, credential=b.credential)
+            if b.max_requests:
+                worst = max(worst, requests / b.max_requests)
+            if b.max_tokens:
+                worst = max(worst, tokens / b.max_tokens)
+        return worst
+
+    def summary(self, since: float, group_by: tuple[str, ...] = _GROUP_COLUMNS) -> list[UsageRow]:
+        cols = [c for c in group_by if c in _GROUP_COLUMNS] or ["provider"]
+        sql = (
+            f"SELECT {', '.join(cols)}, COUNT(*), SUM(1 - ok), SUM(input_tokens), SUM(output_tokens) "
+            f"FROM usage WHERE ts >= ? GROUP BY {', '.join(cols)} ORDER BY {', '.join(cols)}"
+        )
+        with self._lock:
+            rows = self._db.execute(sql, (since,)).fetchall()
+        n = len(cols)
+        return [UsageRow(key=tuple(r[:n]), requests=r[n], errors=r[n + 1], input_tokens=r[n + 2], output_tokens=r[n + 3]) for r in rows]
+
+    def close(self) -> None:
+        self._db.close()
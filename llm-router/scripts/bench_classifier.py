@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+"""Benchmark ErrorClassifier accuracy and speed over the error sample corpus.
+
+Each corpus line is JSON: {"provider", "expected", "text"[, "exit_code"]}.
+Samples are also padded with noisy log lines to measure the bounded window.
+
+Run:
+  cd llm-router
+  python scripts/bench_classifier.py [--corpus tests/data/error_samples.jsonl] [--iterations 2000]
+"""
+
+import argparse
+import json
+import time
+from pathlib import Path
+
+from llm_router.classifier import ErrorClassifier
+
+
+DEFAULT_CORPUS = Path(__file__).resolve().parent.parent / "tests" / "data" / "error_samples.jsonl"
+NOISE = "".join(f"[debug] chunk {i} ok, {i * 7} bytes\n" for i in range(2000))
+
+
+def load(path: Path) -> list[dict]:
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines() if line.strip()]
+
+
+def bench(samples: list[dict], classifier_factory, iterations: int, pad: bool) -> tuple[float, float]:
+    texts = [(NOISE + s["text"]) if pad else s["text"] for s in samples]
+    c = classifier_factory()
+    correct = sum(c.classify(t, exit_code=s.get("exit_code")).value == s["expected"] for t, s in zip(texts, samples))
+
+    c = classifier_factory()
+    t0 = time.perf_counter()
+    for _ in range(iterations):
+        for t, s in zip(texts, samples):
+            c.classify(t, exit_code=s.get("exit_code"))
+    dt = time.perf_counter() - t0
+    return correct / len(samples), dt / (iterations * len(samples)) * 1e6
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--corpus", type=Path, default=DEFAULT_CORPUS)
+    ap.add_argument("--iterations", type=int, default=2000)
+    args = ap.parse_args()
+
+    samples = load(args.corpus)
+    print(f"{len(samples)} samples from {args.corpus}")
+    for label, factory, pad in [
+        ("uncached", lambda: ErrorClassifier(cache_size=0), False),
+        ("cached", lambda: ErrorClassifier(), False),
+        ("uncached+noisy", lambda: ErrorClassifier(cache_size=0), True),
+        ("cached+noisy", lambda: ErrorClassifier(), True),
+    ]:
+        iterations = args.iterations if not pad else max(1, args.iterations // 20)
+        acc, us = bench(samples, factory, iterations, pad)
+        print(f"{label:16s} accuracy={acc:.1%}  {us:8.1f} us/classify")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+"""Offline load test: drive Router at a target RPS against recorded providers.
+
+Record real interactions first (needs the real CLIs once):
+  llm-run --record recordings/session.jsonl.gz "Say OK"
+
+Then replay them at load, no binaries or network needed:
+  cd llm-router
+  python scripts/loadgen.py --replay recordings/session.jsonl.gz --rps 20 --duration 30
+
+Reports throughput and latency percentiles. Router logs go to a temp dir
+unless --log-dir is given.
+"""
+
+import argparse
+import tempfile
+from pathlib import Path
+
+from llm_router.config import load_config
+from llm_router.loadgen import run_load
+from llm_router.logging import JsonlLogger
+from llm_router.providers import ReplayProvider
+from llm_router.router import Router
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--config", default=None, help="Path to config.yml (providers with mode: replay are used as-is)")
+    ap.add_argument("--replay", default=None, help="Recording to replay for every routed provider")
+    ap.add_argument("--rps", type=float, default=10.0)
+    ap.add_argument("--duration", type=float, default=10.0, help="Seconds")
+    ap.add_argument("--concurrency", type=int, default=64)
+    ap.add_argument("--latency", choices=["recorded", "sampled"], default="recorded")
+    ap.add_argument("--latency-scale", type=float, default=1.0)
+    ap.add_argument("--prompts", type=Path, default=None, help="File with one prompt per line (default: a single fixed prompt)")
+    ap.add_argument("--deadline", type=float, default=None)
+    ap.add_argument("--log-dir", default=None)
+    args = ap.parse_args()
+
+    cfg = load_config(args.config)
+    cfg.router.cache.enabled = False
+    providers = {}
+    for i, name in enumerate(cfg.router.providers):
+        if args.replay:
+            try:
+                providers[name] = ReplayProvider(name, args.replay, latency=args.latency, latency_scale=args.latency_scale, seed=i)
+            except ValueError:
+                print(f"[{name}] not in recording, skipped")
+        elif cfg.providers[name].mode == "replay" and cfg.providers[name].replay_file:
+            pcfg = cfg.providers[name]
+            providers[name] = ReplayProvider(name, pcfg.replay_file, latency=pcfg.replay_latency, latency_scale=pcfg.replay_latency_scale, seed=i)
+    if not providers:
+        ap.error("no replay providers: pass --replay or set `mode: replay` + `replay_file` in config")
+
+    prompts = ["Say OK"]
+    if args.prompts:
+        prompts = [line for line in args.prompts.read_text(encoding="utf-8").splitlines() if line.strip()]
+
+    log_dir = args.log_dir or tempfile.mkdtemp(prefix="llm-router-load-")
+    router = Router(cfg=cfg, providers=providers, logger=JsonlLogger(log_dir))
+
+    report = run_load(router, prompts, rps=args.rps, duration_s=args.duration, max_concurrency=args.concurrency, deadline=args.deadline)
+    print(report.summary())
+    print(f"logs: {log_dir}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
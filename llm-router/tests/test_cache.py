@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import json
+
+from llm_router.cache import SimilarityCache, normalize_prompt
+from llm_router.logging import JsonlLogger
+from llm_router.providers.base import ProviderResponse
+from llm_router.router import Router
+
+from test_failover import FakeProvider, _cfg
+
+
+PROMPT = (
+    "You are a code review agent. Review the diff in /home/ci/builds/1234/src/app.py "
+    "generated at 2025-06-01T10:00:00Z and list any bugs, style problems and missing tests. "
+    "Answer with a short bullet list and nothing else."
+)
+
+
+def test_normalize_strips_volatile_tokens():
+    a = normalize_prompt("Run at 2025-06-01T10:00:00Z on  /tmp/a/b.txt\n")
+    b = normalize_prompt("run at 2026-01-02 09:15  on /var/x/y.txt")
+    assert a == b
+
+
+def test_near_duplicate_hit_and_unrelated_miss(tmp_path):
+    cache = SimilarityCache(str(tmp_path / "c.sqlite3"), threshold=0.8)
+    cache.store(PROMPT, "- looks fine", provider="openai_codex", model="x")
+
+    variant = PROMPT.replace("/home/ci/builds/1234", "/home/ci/builds/5678").replace("10:00:00Z", "11:30:00Z") + "  "
+    hit = cache.lookup(variant)
+    assert hit is not None and hit.text == "- looks fine" and hit.similarity >= 0.8
+
+    assert cache.lookup("Translate the following paragraph into French, keeping the tone formal.") is None
+
+
+def test_router_serves_cache_hits_and_logs_them(tmp_path):
+    cfg = _cfg()
+    codex = FakeProvider(name="openai_codex", actions=[ProviderResponse(text="answer", model="x", degraded=False, latency_ms=10)])
+    cache = SimilarityCache(str(tmp_path / "c.sqlite3"))
+    router = Router(cfg, {"openai_codex": codex}, JsonlLogger(str(tmp_path)), cache=cache)
+
+    first = router.run(PROMPT)
+    second = router.run(PROMPT.replace("1234", "9999"))
+    assert (first.cached, second.cached) == (False, True)
+    assert second.text == "answer"
+
+    events = [json.loads(line) for line in (tmp_path / "router.jsonl").read_text(encoding="utf-8").splitlines()]
+    hits = [e for e in events if e["kind"] == "cache_hit"]
+    assert len(hits) == 1 and hits[0]["similarity"] >= 0.9
+
+
+def test_forced_provider_skips_cache_lookup(tmp_path):
+    cfg = _cfg()
+    codex = FakeProvider(name="openai_codex", actions=[ProviderResponse(text="codex", model="x", degraded=False, latency_ms=10)])
+    claude = FakeProvider(name="anthropic_claude", actions=[ProviderResponse(text="claude", model="y", degraded=False, latency_ms=10)])
+    cache = SimilarityCache(str(tmp_path / "c.sqlite3"))
+    router = Router(cfg, {"openai_codex": codex, "anthropic_claude": claude}, JsonlLogger(str(tmp_path)), cache=cache)
+
+    assert router.run(PROMPT).text == "codex"
+    resp = router.run(PROMPT, force_provider="anthropic_claude")
+    assert (resp.text, resp.cached, resp.provider) == ("claude", False, "anthropic_claude")
+
+
+def test_expired_entries_are_pruned_on_store(tmp_path):
+    cache = SimilarityCache(str(tmp_path / "c.sqlite3"), ttl_seconds=-1, prune_every=2)
+    cache.store(PROMPT, "old", provider="openai_codex", model="x")
+    cache.store("Translate this paragraph into French.", "new", provider="openai_codex", model="x")
+
+    (entries,) = cache._db.execute("SELECT COUNT(*) FROM entries").fetchone()
+    (bands,) = cache._db.execute("SELECT COUNT(*) FROM bands").fetchone()
+    assert entries == 0 and bands == 0
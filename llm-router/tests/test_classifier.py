@@ -1,3 +1,6 @@
+import json
+from pathlib import Path
+
 from llm_router.classifier import ErrorClassifier
 from llm_router.errors import ErrorCategory
 
@@ -25,3 +28,37 @@ def test_classify_transient_network():
 def test_classify_invalid_request():
     c = ErrorClassifier()
     assert c.classify("invalid request: unknown model") == ErrorCategory.INVALID_REQUEST
+
+
+def test_bare_status_numbers_in_noisy_logs_do_not_misfire():
+    c = ErrorClassifier()
+    assert c.classify("processed 403 files in 400 ms") == ErrorCategory.UNKNOWN
+    assert c.classify("HTTP 403 Forbidden") == ErrorCategory.AUTH_ERROR
+
+
+def test_json_error_body_is_parsed_first():
+    c = ErrorClassifier()
+    raw = 'API Error: 529 {"type":"error","error":{"type":"overloaded_error","message":"Overloaded"}}'
+    assert c.classify(raw) == ErrorCategory.TRANSIENT_NETWORK
+
+
+def test_provider_rules_and_exit_codes():
+    c = ErrorClassifier(rules={"rate_limited": [r"slow\s*down"]}, exit_codes={41: "auth_error"})
+    assert c.classify("please slow down") == ErrorCategory.RATE_LIMITED
+    assert c.classify("anything", exit_code=41) == ErrorCategory.AUTH_ERROR
+    assert ErrorClassifier().classify("please slow down") == ErrorCategory.UNKNOWN
+
+
+def test_only_head_and_tail_window_is_scanned():
+    c = ErrorClassifier(window_chars=64)
+    noise = "x " * 1000
+    assert c.classify(noise + "rate limit" + noise) == ErrorCategory.UNKNOWN
+    assert c.classify(noise + "rate limit") == ErrorCategory.RATE_LIMITED
+
+
+def test_error_sample_corpus():
+    path = Path(__file__).parent / "data" / "error_samples.jsonl"
+    c = ErrorClassifier()
+    for line in path.read_text(encoding="utf-8").splitlines():
+        s = json.loads(line)
+        assert c.classify(s["text"], exit_code=s.get("exit_code")).value == s["expected"], s["text"]
@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+
+from llm_router.config import CredentialProfile
+from llm_router.credentials import CredentialPool
+from llm_router.errors import ErrorCategory, ProviderError
+from llm_router.logging import JsonlLogger
+from llm_router.providers.base import Provider, ProviderResponse
+from llm_router.router import Router
+
+from test_failover import FakeProvider, _cfg
+
+
+@dataclass
+class PooledProvider(Provider):
+    name: str
+    # profile name -> error to raise; others succeed
+    failing: dict[str, ProviderError]
+    seen: list[str] = field(default_factory=list)
+
+    def run(self, prompt: str, model: str, timeout_seconds: float, max_output_tokens: int, profile: CredentialProfile | None = None) -> ProviderResponse:
+        assert profile is not None
+        self.seen.append(profile.name)
+        if profile.name in self.failing:
+            raise self.failing[profile.name]
+        return ProviderResponse(text=f"ok:{profile.name}", model=model, degraded=False, latency_ms=5)
+
+
+def _profiles(*names: str) -> list[CredentialProfile]:
+    return [CredentialProfile(name=n) for n in names]
+
+
+def test_round_robin_skips_cooling_profiles():
+    pool = CredentialPool(_profiles("a", "b", "c"), quota_cooldown_seconds=100)
+    assert [pool.acquire(0).name for _ in range(4)] == ["a", "b", "c", "a"]
+
+    pool.mark_limited(pool.profiles[1], ErrorCategory.QUOTA_EXHAUSTED, now=0)
+    assert [pool.acquire(1).name for _ in range(3)] == ["c", "a", "c"]
+    assert pool.acquire(101).name == "a"
+
+
+def test_least_recently_limited_prefers_never_limited():
+    pool = CredentialPool(_profiles("a", "b"), strategy="least_recently_limited", rate_limit_cooldown_seconds=1)
+    pool.mark_limited(pool.profiles[0], ErrorCategory.RATE_LIMITED, now=0)
+    # Both usable again at t=5, but "a" was limited more recently.
+    assert pool.acquire(5).name == "b"
+    assert pool.acquire(5).name == "b"
+
+
+def test_router_rotates_credentials_before_failover(tmp_path):
+    cfg = _cfg()
+    cfg.providers["openai_codex"].profiles = _profiles("team-a", "team-b")
+    quota = ProviderError("openai_codex", ErrorCategory.QUOTA_EXHAUSTED, "quota", raw="insufficient_quota")
+    codex = PooledProvider(name="openai_codex", failing={"team-a": quota})
+    claude = FakeProvider(name="anthropic_claude", actions=[])
+
+    router = Router(cfg, {"openai_codex": codex, "anthropic_claude": claude}, JsonlLogger(str(tmp_path)))
+    assert router.run("hi").text == "ok:team-b"
+    # team-a is cooling down, so the next request goes straight to team-b.
+    assert router.run("hi").text == "ok:team-b"
+    assert codex.seen == ["team-a", "team-b", "team-b"]
+
+
+def test_router_fails_over_when_all_credentials_cooling(tmp_path):
+    cfg = _cfg()
+    cfg.providers["openai_codex"].profiles = _profiles("team-a")
+    quota = ProviderError("openai_codex", ErrorCategory.QUOTA_EXHAUSTED, "quota", raw="insufficient_quota")
+    codex = PooledProvider(name="openai_codex", failing={"team-a": quota})
+    claude = FakeProvider(
+        name="anthropic_claude",
+        actions=[ProviderResponse(text="ok", model="y", degraded=False, latency_ms=10) for _ in range(2)],
+    )
+
+    router = Router(cfg, {"openai_codex": codex, "anthropic_claude": claude}, JsonlLogger(str(tmp_path)))
+    assert router.run("hi").text == "ok"
+    assert router.run("hi").text == "ok"
+    assert codex.seen == ["team-a"]
+
+
+def test_router_tries_each_credential_once_per_run(tmp_path):
+    cfg = _cfg()
+    cfg.providers["openai_codex"].profiles = _profiles("team-a", "team-b")
+    # With no cooldown, the pool would happily hand out the same profiles forever.
+    cfg.providers["openai_codex"].rate_limit_cooldown_seconds = 0
+    rate = ProviderError("openai_codex", ErrorCategory.RATE_LIMITED, "rate limited", raw="429")
+    codex = PooledProvider(name="openai_codex", failing={"team-a": rate, "team-b": rate})
+    claude = FakeProvider(name="anthropic_claude", actions=[ProviderResponse(text="ok", model="y", degraded=False, latency_ms=10)])
+
+    router = Router(cfg, {"openai_codex": codex, "anthropic_claude": claude}, JsonlLogger(str(tmp_path)))
+    assert router.run("hi").text == "ok"
+    assert codex.seen == ["team-a", "team-b"]
@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+
+import pytest
+
+from llm_router.errors import ErrorCategory, ProviderError
+from llm_router.logging import JsonlLogger
+from llm_router.providers.base import Provider, ProviderResponse
+from llm_router.router import Router
+
+from test_failover import _cfg
+from test_retry import FakeClock
+
+
+@dataclass
+class TimedProvider(Provider):
+    name: str
+    clock: FakeClock
+    # simulated seconds per call (capped at the timeout it was given)
+    cost: float
+    fail: bool = True
+    timeouts: list[float] = field(default_factory=list)
+
+    def run(self, prompt: str, model: str, timeout_seconds: float, max_output_tokens: int) -> ProviderResponse:
+        self.timeouts.append(timeout_seconds)
+        self.clock.now += min(self.cost, timeout_seconds)
+        if self.fail or self.cost > timeout_seconds:
+            raise ProviderError(self.name, ErrorCategory.TRANSIENT_NETWORK, "timeout")
+        return ProviderResponse(text=f"ok:{self.name}", model=model, degraded=False, latency_ms=int(self.cost * 1000))
+
+
+def _router(tmp_path, costs: dict[str, tuple[float, bool]]) -> tuple[Router, dict[str, TimedProvider]]:
+    cfg = _cfg()
+    cfg.router.timeout_seconds = 10
+    cfg.router.retry = {}
+    clock = FakeClock()
+    providers = {n: TimedProvider(name=n, clock=clock, cost=c, fail=f) for n, (c, f) in costs.items()}
+    router = Router(cfg, providers, JsonlLogger(str(tmp_path)))
+    router._clock = clock
+    router._sleep = clock.sleep
+    return router, providers
+
+
+def test_remaining_budget_shrinks_provider_timeout(tmp_path):
+    router, ps = _router(tmp_path, {"openai_codex": (3.0, True), "anthropic_claude": (1.0, False)})
+
+    resp = router.run("hi", deadline=5)
+    assert resp.text == "ok:anthropic_claude"
+    assert ps["openai_codex"].timeouts == [5]
+    assert ps["anthropic_claude"].timeouts == [2]
+
+
+def test_deadline_exceeded_error(tmp_path):
+    router, ps = _router(tmp_path, {"openai_codex": (6.0, True), "anthropic_claude": (1.0, False)})
+
+    with pytest.raises(ProviderError) as ei:
+        router.run("hi", deadline=5)
+    assert ei.value.category == ErrorCategory.DEADLINE_EXCEEDED
+    assert "Deadline of 5s exceeded" in ei.value.message
+    assert ps["anthropic_claude"].timeouts == []
+
+
+def test_provider_skipped_when_budget_below_p50(tmp_path):
+    router, ps = _router(
+        tmp_path,
+        {"openai_codex": (1.0, True), "anthropic_claude": (1.0, False), "google_gemini": (1.0, False)},
+    )
+    router._record_latency("anthropic_claude", 8000)
+
+    resp = router.run("hi", deadline=5)
+    assert resp.text == "ok:google_gemini"
+    assert ps["anthropic_claude"].timeouts == []
+    assert '"kind": "skip"' in (tmp_path / "router.jsonl").read_text(encoding="utf-8")
+
+
+def test_p50_skip_does_not_mask_other_failures(tmp_path):
+    router, ps = _router(tmp_path, {"openai_codex": (1.0, True), "anthropic_claude": (1.0, False)})
+    router._record_latency("openai_codex", 500)
+    router._record_latency("anthropic_claude", 8000)
+
+    with pytest.raises(ProviderError) as ei:
+        router.run("hi", deadline=5)
+    # Codex failed with plenty of budget left; the skip alone is not a deadline error.
+    assert ei.value.category != ErrorCategory.DEADLINE_EXCEEDED
+    assert ps["anthropic_claude"].timeouts == []
+
+    for _ in range(2):
+        router._record_latency("openai_codex", 8000)
+    with pytest.raises(ProviderError) as ei:
+        router.run("hi", deadline=5)
+    assert ei.value.category == ErrorCategory.DEADLINE_EXCEEDED
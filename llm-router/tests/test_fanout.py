@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass
+
+import pytest
+
+from llm_router.config import Budget
+from llm_router.errors import ErrorCategory, ProviderError
+from llm_router import cli
+from llm_router.fanout import FanoutResult, merge_first_k, merge_longest, merge_majority
+from llm_router.logging import JsonlLogger
+from llm_router.providers.base import Provider, ProviderResponse
+from llm_router.router import Router
+
+from test_failover import _cfg
+
+
+@dataclass
+class SlowProvider(Provider):
+    name: str
+    text: str | None  # None -> fail with a rate limit
+    delay: float = 0.0
+
+    def run(self, prompt: str, model: str, timeout_seconds: float, max_output_tokens: int) -> ProviderResponse:
+        time.sleep(self.delay)
+        if self.text is None:
+            raise ProviderError(self.name, ErrorCategory.RATE_LIMITED, "rate", raw="429 too many requests")
+        return ProviderResponse(text=self.text, model=model, degraded=False, latency_ms=int(self.delay * 1000))
+
+
+def _ok(provider: str, text: str) -> FanoutResult:
+    return FanoutResult(provider=provider, latency_ms=1, response=ProviderResponse(text=text, model="m", degraded=False, latency_ms=1))
+
+
+def test_merge_strategies():
+    results = [_ok("a", "Paris."), _ok("b", "The capital is Paris, France."), _ok("c", "paris")]
+    assert merge_majority(results, 1).provider == "a"
+    assert merge_longest(results, 1).provider == "b"
+
+
+def test_first_k_votes_among_the_first_k_answers():
+    results = [_ok("a", "No"), _ok("b", "Yes."), _ok("c", "yes"), _ok("d", "no")]
+    assert merge_first_k(results, 1).provider == "a"
+    assert merge_first_k(results, 3).provider == "b"
+
+
+def test_fanout_runs_providers_concurrently(tmp_path):
+    cfg = _cfg()
+    providers = {
+        "openai_codex": SlowProvider("openai_codex", "Yes", 0.2),
+        "anthropic_claude": SlowProvider("anthropic_claude", "yes.", 0.2),
+        "google_gemini": SlowProvider("google_gemini", "No", 0.2),
+    }
+    router = Router(cfg, providers, JsonlLogger(str(tmp_path)))
+
+    t0 = time.monotonic()
+    result = router.fanout("q", n=3, merge="majority")
+    assert time.monotonic() - t0 < 0.5
+    assert result.merged.text in {"Yes", "yes."}
+    assert len(result.results) == 3
+
+
+def test_fanout_first_k_returns_before_stragglers(tmp_path):
+    cfg = _cfg()
+    release = threading.Event()
+
+    @dataclass
+    class Blocking(SlowProvider):
+        def run(self, *args, **kwargs) -> ProviderResponse:
+            release.wait(5)
+            return super().run(*args, **kwargs)
+
+    providers = {
+        "openai_codex": SlowProvider("openai_codex", "fast", 0.0),
+        "anthropic_claude": Blocking("anthropic_claude", "slow", 0.0),
+    }
+    router = Router(cfg, providers, JsonlLogger(str(tmp_path)))
+    try:
+        result = router.fanout("q", n=2, merge="first_k", k=1)
+        assert result.provider == "openai_codex"
+        assert [r.provider for r in result.results] == ["openai_codex"]
+        # The straggler must not keep the process alive once the CLI is done.
+        stragglers = [t for t in threading.enumerate() if t.name.startswith("llm-fanout")]
+        assert stragglers and all(t.daemon for t in stragglers)
+    finally:
+        release.set()
+
+
+def test_fanout_all_limited_raises_usage_limit_message(tmp_path):
+    cfg = _cfg()
+    providers = {"openai_codex": SlowProvider("openai_codex", None), "anthropic_claude": SlowProvider("anthropic_claude", None)}
+    router = Router(cfg, providers, JsonlLogger(str(tmp_path)))
+
+    with pytest.raises(ProviderError) as ei:
+        router.fanout("q", n=2)
+    assert ei.value.category == ErrorCategory.QUOTA_EXHAUSTED
+
+
+def test_unknown_merge_strategy_is_a_clear_error(tmp_path):
+    cfg = _cfg()
+    router = Router(cfg, {"openai_codex": SlowProvider("openai_codex", "a", 0.0)}, JsonlLogger(str(tmp_path)))
+    with pytest.raises(ValueError, match="unknown consensus merge strategy"):
+        router.fanout("q", merge="mode")
+
+    cfg.router.consensus_merge = "mode"
+    with pytest.raises(ValueError, match="first_k, majority, longest"):
+        Router(cfg, {}, JsonlLogger(str(tmp_path)))
+
+
+def test_fanout_passes_over_providers_past_their_budget(tmp_path):
+    cfg = _cfg()
+    cfg.providers["openai_codex"].budgets = [Budget(window_seconds=3600, max_requests=1)]
+    providers = {
+        "openai_codex": SlowProvider("openai_codex", "a"),
+        "anthropic_claude": SlowProvider("anthropic_claude", "a"),
+        "google_gemini": SlowProvider("google_gemini", "a"),
+    }
+    router = Router(cfg, providers, JsonlLogger(str(tmp_path)))
+
+    first = router.fanout("q", n=2, merge="majority")
+    assert {r.provider for r in first.results} == {"openai_codex", "anthropic_claude"}
+    # Codex spent its budget on the first fan-out; the next provider in order takes its place.
+    for _ in range(2):
+        again = router.fanout("q", n=2, merge="majority")
+        assert {r.provider for r in again.results} == {"anthropic_claude", "google_gemini"}
+    assert router.ledger.totals("openai_codex", since=0)[0] == 1
+
+
+def test_cli_rejects_provider_with_fanout(capsys):
+    with pytest.raises(SystemExit):
+        cli.main(["--fanout", "2", "--provider", "openai_codex", "q"])
+    assert "--provider cannot be combined with --fanout" in capsys.readouterr().err
@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import sys
+import time
+
+import pytest
+
+from llm_router.config import OutputRules
+from llm_router.errors import ErrorCategory, ProviderError
+from llm_router.providers.cli_provider import CliProvider
+from llm_router.providers.output_filter import OutputFilter
+
+
+class ScriptProvider(CliProvider):
+    """Runs a Python snippet as the "CLI"; the prompt is passed as the last argv entry."""
+
+    script = ""
+
+    def build_command(self, prompt: str, model: str, max_output_tokens: int) -> list[str]:
+        return [self.cli_cmd, "-c", self.script, prompt]
+
+
+def _provider(script: str, **kwargs) -> ScriptProvider:
+    p = ScriptProvider(name="script", cli_cmd=sys.executable, **kwargs)
+    p.script = script
+    return p
+
+
+def test_filter_strips_ansi_progress_and_noise():
+    f = OutputFilter(OutputRules(drop_lines=[r"^Loaded cached credentials"]))
+    for line in ["Loaded cached credentials.\n", "\x1b[32mHello\x1b[0m\n", "10%\r50%\r100%\n", "world\n"]:
+        f.feed(line)
+    assert f.text() == "Hello\n100%\nworld"
+
+
+def test_filter_keeps_only_final_section_and_bounded_tail():
+    f = OutputFilter(OutputRules(section_start=r"^codex$"))
+    for line in ["banner\n", "codex\n", "draft\n", "codex\n", "final answer\n"]:
+        f.feed(line)
+    assert f.text() == "final answer"
+
+    tail = OutputFilter(OutputRules(), max_chars=20)
+    for i in range(100):
+        tail.feed(f"line {i}\n")
+    assert tail.text() == "line 98\nline 99"
+
+
+def test_cli_provider_filters_stdout_while_streaming():
+    p = _provider(
+        "import sys\n"
+        "print('\\x1b[1mBANNER\\x1b[0m'); print('noise: 1'); print('answer to', sys.argv[-1])",
+        output_rules=OutputRules(drop_lines=[r"^noise:"]),
+    )
+    resp = p.run("hi", "", 30, 100)
+    assert resp.text == "BANNER\nanswer to hi"
+
+
+def test_cli_provider_reads_last_message_file():
+    p = _provider(
+        "import sys\n"
+        "print('progress ' * 50)\n"
+        "open(sys.argv[2], 'w').write('final: ' + sys.argv[-1])"
+    )
+    p.last_message_flag = "--output-last-message"
+    assert p.run("hi", "", 30, 100).text == "final: hi"
+
+
+def test_cli_provider_empty_last_message_file_is_an_error():
+    p = _provider("print('x' * 20000)")
+    p.last_message_flag = "--output-last-message"
+    with pytest.raises(ProviderError) as ei:
+        p.run("hi", "", 30, 100)
+    assert ei.value.message == "empty last-message file"
+
+
+def test_cli_provider_timeout_kills_process():
+    p = _provider("import time; time.sleep(30)")
+    with pytest.raises(ProviderError) as ei:
+        p.run("hi", "", 0.5, 100)
+    assert ei.value.category == ErrorCategory.TRANSIENT_NETWORK
+
+
+def test_cli_provider_timeout_kills_grandchildren_holding_stdout():
+    # Like an npm wrapper: the real work happens in a child that inherits stdout.
+    p = _provider(
+        "import subprocess, sys, time\n"
+        "subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(6)'])\n"
+        "time.sleep(30)"
+    )
+    t0 = time.monotonic()
+    with pytest.raises(ProviderError) as ei:
+        p.run("hi", "", 1, 100)
+    assert ei.value.message == "timeout"
+    assert time.monotonic() - t0 < 3
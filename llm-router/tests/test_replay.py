@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import gzip
+
+import pytest
+
+from llm_router.errors import ErrorCategory, ProviderError
+from llm_router.loadgen import percentile, run_load
+from llm_router.logging import JsonlLogger
+from llm_router.providers import RecordingProvider, ReplayProvider
+from llm_router.providers.base import ProviderResponse
+from llm_router.router import Router
+
+from test_failover import FakeProvider, _cfg
+
+
+def _record(path) -> None:
+    inner = FakeProvider(
+        name="openai_codex",
+        actions=[
+            ProviderResponse(text="hello", model="x", degraded=False, latency_ms=120),
+            ProviderError("openai_codex", ErrorCategory.RATE_LIMITED, "rate", raw="429 too many requests"),
+        ],
+    )
+    rec = RecordingProvider(inner, path)
+    rec.run("a", "x", 10, 100)
+    with pytest.raises(ProviderError):
+        rec.run("b", "x", 10, 100)
+
+
+def test_record_then_replay_is_deterministic(tmp_path):
+    path = tmp_path / "rec.jsonl.gz"
+    _record(path)
+
+    sleeps: list[float] = []
+    replay = ReplayProvider("openai_codex", path, latency_scale=0.5, sleep=sleeps.append)
+    assert replay.run("a", "x", 10, 100).text == "hello"
+    with pytest.raises(ProviderError) as ei:
+        replay.run("b", "x", 10, 100)
+    assert ei.value.category == ErrorCategory.RATE_LIMITED
+    assert sleeps[0] == pytest.approx(0.06)
+
+    # Recordings never contain the prompt itself.
+    assert b'"a"' not in gzip.decompress(path.read_bytes())
+
+
+def test_replay_latency_above_timeout_is_a_timeout(tmp_path):
+    path = tmp_path / "rec.jsonl"
+    _record(path)
+    replay = ReplayProvider("openai_codex", path, sleep=lambda s: None)
+    with pytest.raises(ProviderError) as ei:
+        replay.run("a", "x", 0.05, 100)
+    assert ei.value.category == ErrorCategory.TRANSIENT_NETWORK
+
+
+def test_recording_redacts_secrets(tmp_path):
+    key = "sk-" + "a1B2c3D4e5F6g7H8i9J0k1L2m3N4"
+    inner = FakeProvider(
+        name="openai_codex",
+        actions=[
+            ProviderResponse(text=f"your key is {key}", model="x", degraded=False, latency_ms=5),
+            ProviderError("openai_codex", ErrorCategory.AUTH_ERROR, f"bad key {key}", raw=f"401 invalid api key {key}"),
+        ],
+    )
+    rec = RecordingProvider(inner, tmp_path / "rec.jsonl.gz")
+    rec.run("hi", "x", 10, 100)
+    with pytest.raises(ProviderError):
+        rec.run("hi", "x", 10, 100)
+
+    with gzip.open(tmp_path / "rec.jsonl.gz", "rt", encoding="utf-8") as f:
+        content = f.read()
+    assert "sk-" not in content and "[REDACTED]" in content
+
+
+def test_recorders_sharing_a_path_share_a_lock(tmp_path):
+    a = RecordingProvider(FakeProvider(name="openai_codex", actions=[]), tmp_path / "rec.jsonl.gz")
+    b = RecordingProvider(FakeProvider(name="anthropic_claude", actions=[]), tmp_path / "." / "rec.jsonl.gz")
+    c = RecordingProvider(FakeProvider(name="google_gemini", actions=[]), tmp_path / "other.jsonl.gz")
+    assert a._lock is b._lock
+    assert a._lock is not c._lock
+
+
+def test_percentile_nearest_rank():
+    values = [float(v) for v in range(1, 101)]
+    assert percentile(values, 50) == 50
+    assert percentile(values, 99) == 99
+    assert percentile([], 50) == 0.0
+
+
+def test_load_generator_reports_throughput(tmp_path):
+    path = tmp_path / "rec.jsonl"
+    _record(path)
+    cfg = _cfg()
+    cfg.router.providers = ["openai_codex"]
+    replay = ReplayProvider("openai_codex", path, latency_scale=0.01)
+    router = Router(cfg, {"openai_codex": replay}, JsonlLogger(str(tmp_path)))
+
+    report = run_load(router, ["a"], rps=200, duration_s=0.1)
+    assert report.requests == 20
+    assert report.ok == 20
+    assert report.throughput_rps > 0
@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import random
+
+from llm_router.config import RetryPolicy
+from llm_router.errors import ErrorCategory, ProviderError
+from llm_router.logging import JsonlLogger
+from llm_router.providers.base import ProviderResponse
+from llm_router.retry import backoff_delay
+from llm_router.router import Router
+
+from test_failover import FakeProvider, _cfg
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+        self.sleeps: list[float] = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, s: float) -> None:
+        self.sleeps.append(s)
+        self.now += s
+
+
+def _router(cfg, providers, tmp_path) -> tuple[Router, FakeClock]:
+    router = Router(cfg, providers, JsonlLogger(str(tmp_path)))
+    clock = FakeClock()
+    router._clock = clock
+    router._sleep = clock.sleep
+    router._rng = random.Random(0)
+    return router, clock
+
+
+def _timeout(name: str) -> ProviderError:
+    return ProviderError(name, ErrorCategory.TRANSIENT_NETWORK, "timeout", raw="timed out")
+
+
+def test_backoff_delay_is_capped_full_jitter():
+    policy = RetryPolicy(max_attempts=5, base_delay_seconds=1.0, max_delay_seconds=3.0)
+    rng = random.Random(1)
+    for attempt in range(1, 6):
+        d = backoff_delay(policy, attempt, rng)
+        assert 0.0 <= d <= min(3.0, 2 ** (attempt - 1))
+
+
+def test_transient_error_retries_same_provider(tmp_path):
+    cfg = _cfg()
+    codex = FakeProvider(
+        name="openai_codex",
+        actions=[_timeout("openai_codex"), ProviderResponse(text="ok", model="x", degraded=False, latency_ms=10)],
+    )
+    claude = FakeProvider(name="anthropic_claude", actions=[])
+    router, clock = _router(cfg, {"openai_codex": codex, "anthropic_claude": claude}, tmp_path)
+
+    resp = router.run("hi")
+    assert resp.text == "ok"
+    assert len(clock.sleeps) == 1
+
+    lines = (tmp_path / "router.jsonl").read_text(encoding="utf-8").splitlines()
+    assert sum('"kind": "attempt"' in line for line in lines) == 2
+    assert any('"reason": "retry"' in line for line in lines)
+
+
+def test_retries_stop_at_max_attempts_then_failover(tmp_path):
+    cfg = _cfg()
+    cfg.router.retry["transient_network"] = RetryPolicy(max_attempts=2, base_delay_seconds=0.1, max_delay_seconds=0.1)
+    codex = FakeProvider(name="openai_codex", actions=[_timeout("openai_codex") for _ in range(3)])
+    claude = FakeProvider(name="anthropic_claude", actions=[ProviderResponse(text="ok2", model="y", degraded=False, latency_ms=10)])
+    router, clock = _router(cfg, {"openai_codex": codex, "anthropic_claude": claude}, tmp_path)
+
+    assert router.run("hi").text == "ok2"
+    assert len(codex.actions) == 1
+    assert len(clock.sleeps) == 1
+
+
+def test_retry_not_scheduled_past_deadline(tmp_path):
+    cfg = _cfg()
+    cfg.router.retry["transient_network"] = RetryPolicy(max_attempts=5, base_delay_seconds=10.0, max_delay_seconds=10.0)
+    codex = FakeProvider(name="openai_codex", actions=[_timeout("openai_codex") for _ in range(5)])
+    claude = FakeProvider(name="anthropic_claude", actions=[ProviderResponse(text="ok2", model="y", degraded=False, latency_ms=10)])
+    router, clock = _router(cfg, {"openai_codex": codex, "anthropic_claude": claude}, tmp_path)
+
+    # The jittered delay (seeded, well above 1ms) does not fit in the deadline.
+    assert router.run("hi", deadline=0.001).text == "ok2"
+    assert clock.sleeps == []
+    assert len(codex.actions) == 4
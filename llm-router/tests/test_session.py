@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+
+import pytest
+
+from llm_router.config import CredentialProfile
+from llm_router.errors import ErrorCategory, ProviderError
+from llm_router.logging import JsonlLogger
+from llm_router.providers.anthropic_claude import AnthropicClaudeProvider
+from llm_router.providers.base import Provider, ProviderResponse, ResumeToken
+from llm_router.router import Router
+
+from test_failover import _cfg
+from test_retry import FakeClock
+
+
+@dataclass
+class EchoProvider(Provider):
+    name: str
+    resumable: bool = False
+    fail_next: bool = False
+    calls: list[tuple[str, ResumeToken | None]] = field(default_factory=list)
+
+    def supports_resume(self) -> bool:
+        return self.resumable
+
+    def run(self, prompt: str, model: str, timeout_seconds: float, max_output_tokens: int, session: ResumeToken | None = None) -> ProviderResponse:
+        self.calls.append((prompt, ResumeToken(session.id, session.turn) if session else None))
+        if self.fail_next:
+            self.fail_next = False
+            raise ProviderError(self.name, ErrorCategory.RATE_LIMITED, "rate", raw="429 too many requests")
+        return ProviderResponse(text=f"reply{len(self.calls)}", model=model, degraded=False, latency_ms=1)
+
+
+def _router(tmp_path, codex: EchoProvider, claude: EchoProvider) -> Router:
+    cfg = _cfg()
+    cfg.router.providers = ["anthropic_claude", "openai_codex"]
+    return Router(cfg, {"anthropic_claude": claude, "openai_codex": codex}, JsonlLogger(str(tmp_path)))
+
+
+def test_native_resume_sends_only_new_message(tmp_path):
+    claude = EchoProvider("anthropic_claude", resumable=True)
+    codex = EchoProvider("openai_codex")
+    s = _router(tmp_path, codex, claude).session()
+
+    s.send("first")
+    s.send("second")
+    s.send("third")
+
+    assert [p for p, _ in claude.calls] == ["first", "second", "third"]
+    ids = {tok.id for _, tok in claude.calls}
+    assert len(ids) == 1
+    assert [tok.turn for _, tok in claude.calls] == [0, 1, 2]
+    assert codex.calls == []
+
+
+def test_failover_replays_compact_history_and_repins(tmp_path):
+    claude = EchoProvider("anthropic_claude", resumable=True)
+    codex = EchoProvider("openai_codex")
+    s = _router(tmp_path, codex, claude).session()
+
+    s.send("first")
+    claude.fail_next = True
+    s.send("second")
+    assert s.provider == "openai_codex"
+    prompt, token = codex.calls[0]
+    assert "User: first" in prompt and "Assistant: reply1" in prompt and prompt.endswith("second")
+    assert token is None
+
+    # Pinned to codex now; no native resume there, so history is replayed.
+    s.send("third")
+    assert len(codex.calls) == 2 and "User: second" in codex.calls[1][0]
+
+
+@dataclass
+class PooledEchoProvider(EchoProvider):
+    profiles: list[str] = field(default_factory=list)
+
+    def run(
+        self,
+        prompt: str,
+        model: str,
+        timeout_seconds: float,
+        max_output_tokens: int,
+        profile: CredentialProfile | None = None,
+        session: ResumeToken | None = None,
+    ) -> ProviderResponse:
+        assert profile is not None
+        self.profiles.append(profile.name)
+        return super().run(prompt, model, timeout_seconds, max_output_tokens, session=session)
+
+
+def test_native_resume_keeps_credential_profile(tmp_path):
+    cfg = _cfg()
+    cfg.router.providers = ["anthropic_claude", "openai_codex"]
+    cfg.providers["anthropic_claude"].profiles = [CredentialProfile(name="team-a"), CredentialProfile(name="team-b")]
+    claude = PooledEchoProvider("anthropic_claude", resumable=True)
+    router = Router(cfg, {"anthropic_claude": claude, "openai_codex": EchoProvider("openai_codex")}, JsonlLogger(str(tmp_path)))
+    s = router.session()
+
+    for msg in ("first", "second", "third"):
+        s.send(msg)
+    # Round robin alone would alternate accounts and lose the native history.
+    assert claude.profiles == ["team-a", "team-a", "team-a"]
+    assert [tok.turn for _, tok in claude.calls] == [0, 1, 2]
+
+    # Ordinary runs still rotate.
+    router.run("other")
+    assert claude.profiles[-1] == "team-b"
+
+
+@dataclass
+class ClockedProvider(EchoProvider):
+    clock: FakeClock | None = None
+    cost: float = 0.0
+    timeouts: list[float] = field(default_factory=list)
+
+    def run(self, prompt: str, model: str, timeout_seconds: float, max_output_tokens: int, session: ResumeToken | None = None) -> ProviderResponse:
+        self.timeouts.append(timeout_seconds)
+        assert self.clock is not None
+        self.clock.now += min(self.cost, timeout_seconds)
+        return super().run(prompt, model, timeout_seconds, max_output_tokens, session=session)
+
+
+def _clocked_session(tmp_path, claude_cost: float):
+    clock = FakeClock()
+    claude = ClockedProvider("anthropic_claude", resumable=True, clock=clock, cost=1.0)
+    codex = ClockedProvider("openai_codex", clock=clock, cost=1.0)
+    router = _router(tmp_path, codex, claude)
+    router.cfg.router.retry = {}
+    router.cfg.router.timeout_seconds = 60
+    router._clock = clock
+    router._sleep = clock.sleep
+    s = router.session()
+    s.send("first")
+    claude.cost = claude_cost
+    claude.fail_next = True
+    return s, claude, codex
+
+
+def test_session_deadline_covers_native_turn_and_replay(tmp_path):
+    s, claude, codex = _clocked_session(tmp_path, claude_cost=15.0)
+    s.send("second", deadline=20)
+    # The native attempt used 15s, so the replay only gets what is left.
+    assert claude.timeouts[-1] == 20
+    assert codex.timeouts == [5]
+
+
+def test_session_skips_replay_after_native_deadline(tmp_path):
+    s, claude, codex = _clocked_session(tmp_path, claude_cost=30.0)
+    with pytest.raises(ProviderError) as ei:
+        s.send("second", deadline=20)
+    assert ei.value.category == ErrorCategory.DEADLINE_EXCEEDED
+    assert codex.calls == []
+
+
+def test_compact_prompt_is_bounded(tmp_path):
+    s = _router(tmp_path, EchoProvider("openai_codex"), EchoProvider("anthropic_claude")).session()
+    s.max_context_chars = 3000
+    for i in range(50):
+        s.send(f"message {i} " + "x" * 300)
+    prompt = s.compact_prompt("next")
+    # Budget covers the history lines; only the header and current request sit on top.
+    assert len(prompt) <= 3000 + 100
+    assert "message 49" in prompt and "message 0 " not in prompt
+
+
+def test_claude_resume_flags():
+    p = AnthropicClaudeProvider(name="anthropic_claude", cli_cmd="claude")
+    assert "--session-id" in p.build_command("hi", "", 100, session=ResumeToken("abc", 0))
+    assert p.build_command("hi", "", 100, session=ResumeToken("abc", 1))[-3:] == ["--resume", "abc", "hi"]
@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import time
+
+from llm_router import cli
+from llm_router.config import Budget, CredentialProfile, parse_duration
+from llm_router.logging import JsonlLogger
+from llm_router.providers.base import ProviderResponse
+from llm_router.router import Router
+from llm_router.usage import UsageLedger
+
+from test_credentials import PooledProvider
+from test_failover import FakeProvider, _cfg
+
+
+def _ok(text: str = "ok") -> ProviderResponse:
+    return ProviderResponse(text=text, model="", degraded=False, latency_ms=1)
+
+
+def test_parse_duration():
+    assert parse_duration("90") == 90
+    assert parse_duration("30m") == 1800
+    assert parse_duration("5h") == 18000
+    assert parse_duration("7d") == 7 * 86400
+
+
+def test_ledger_window_queries(tmp_path):
+    ledger = UsageLedger(tmp_path / "u.sqlite3")
+    now = time.time()
+    ledger.record("openai_codex", "x", credential="a", input_tokens=10, output_tokens=5, ts=now - 7200)
+    ledger.record("openai_codex", "x", credential="b", input_tokens=20, output_tokens=5, ts=now)
+    ledger.record("openai_codex", "x", credential="b", input_tokens=20, ok=False, error_category="rate_limited", ts=now)
+
+    assert ledger.totals("openai_codex", since=now - 3600) == (2, 45)
+    rows = ledger.summary(since=now - 3600, group_by=("provider", "credential"))
+    assert [(r.key, r.requests, r.errors) for r in rows] == [(("openai_codex", "b"), 2, 1)]
+
+
+def test_router_degrades_then_shifts_on_budget(tmp_path):
+    cfg = _cfg()
+    cfg.providers["openai_codex"].budgets = [Budget(window_seconds=3600, max_requests=10)]
+    codex = FakeProvider(name="openai_codex", actions=[_ok() for _ in range(10)])
+    claude = FakeProvider(name="anthropic_claude", actions=[_ok("claude")])
+    router = Router(cfg, {"openai_codex": codex, "anthropic_claude": claude}, JsonlLogger(str(tmp_path)))
+
+    for _ in range(8):
+        assert not router.run("hi").degraded
+    # 8/10 used -> degraded model.
+    assert router.run("hi").degraded
+    router.run("hi")
+    # 10/10 used -> traffic shifts to the next provider.
+    assert router.run("hi").text == "claude"
+
+
+def test_credential_budgets_shift_only_when_every_profile_is_spent(tmp_path):
+    cfg = _cfg()
+    pcfg = cfg.providers["openai_codex"]
+    pcfg.profiles = [CredentialProfile(name="team-a"), CredentialProfile(name="team-b")]
+    pcfg.budgets = [Budget(window_seconds=3600, max_requests=2, credential=name) for name in ("team-a", "team-b")]
+    codex = PooledProvider(name="openai_codex", failing={})
+    claude = FakeProvider(name="anthropic_claude", actions=[_ok("claude")])
+    router = Router(cfg, {"openai_codex": codex, "anthropic_claude": claude}, JsonlLogger(str(tmp_path)))
+
+    router.run("hi")
+    router.run("hi")
+    router.run("hi")
+    # team-a is spent; team-b still has room even though the pool as a whole is at 3/4.
+    assert router.run("hi").text == "ok:team-b"
+    assert router.run("hi").text == "claude"
+    assert codex.seen == ["team-a", "team-b", "team-a", "team-b"]
+
+
+def test_usage_command_reports(tmp_path, capsys):
+    cfg_path = tmp_path / "config.yml"
+    cfg_path.write_text(
+        f"router:\n  providers: [openai_codex]\n  log_dir: {tmp_path.as_posix()}\n"
+        "openai_codex:\n  budgets:\n    - window: 1h\n      max_requests: 4\n",
+        encoding="utf-8",
+    )
+    UsageLedger(tmp_path / "usage.sqlite3").record("openai_codex", "gpt-x", input_tokens=12, output_tokens=3)
+
+    cli.main(["usage", "--config", str(cfg_path), "--window", "1h"])
+    out = capsys.readouterr().out
+    assert "openai_codex  gpt-x" in out
+    assert "budget openai_codex: 25% used (ok)" in out